@@ -32,7 +32,6 @@ CRITICAL: Perform a critical hit, with a CRIT_MULTIPLIER damage multiplier.
 """
 
 import coordinates
-import rng
 import events
 import tcod_display as display
 import exc
@@ -165,7 +164,8 @@ class Heal(Action):
                     else:
                         HP_bonus = extra_HP // 4
                         HP_overflow = extra_HP - (HP_bonus * 4)
-                        HP_bonus += rng.percentChance(HP_overflow * 25)
+                        HP_bonus += self.source.currentLevel.rng.combat \
+                            .percentChance(HP_overflow * 25)
                     self.destination.max_HP += HP_bonus
                     self.destination.setHP(self.destination.max_HP)
             else:
@@ -340,7 +340,7 @@ class Detonate(Action):
         for coords in explosion_radius:
             level_.addSolidEffect(coords, self.EXPLOSION_GLYPH)
 
-        kb.question(level_.messages, "%s explodes (%d)! --MORE--" % (self.source.getName(), self.damage))
+        kb.question(level_.messages, "%s explodes (%d)! --MORE--" % (self.source.getName(), self.damage), "pause")
 
         for explosion_coords in explosion_radius:
             if explosion_coords in level_.dudeLayer:
@@ -575,6 +575,7 @@ class HasteAll(Action):
             % {"SOURCE_NAME": self.source.getName()}, self.source.coords)
         if self.hit_user:
             HasteMonster(self.source, self.source, self.duration * 2).do()
+        self.source.resetFOV()
         for d in self.source.fov.dudes:
             if (not d.isPlayer()) or self.hit_player:
                 HasteMonster(self.source, d, self.duration).do()
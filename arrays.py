@@ -1,6 +1,7 @@
 """
 Contains a number of helpful functions for working with 2-D arrays, especially
-arrays of characters.  Arrays of characters are arrays of one-element strings.
+arrays of characters.  Arrays of characters are arrays of tiles (see symbol),
+integers which each stand for a glyph in the global palette.
 """
 
 import coordinates
@@ -28,17 +29,16 @@ def find(element, array):
     If no such integers exist, return None.
     """
 
-    for x in range(array.shape[0]):
-        for y in range(array.shape[1]):
-            if array[x,y] == element:
-                return (x,y)
+    matches = numpy.argwhere(array == element)
+    if len(matches) == 0:
+        return None
 
-    return None
+    return (int(matches[0][0]), int(matches[0][1]))
 
 def overlay(arrays, heights):
     """
     Return a tuple of two arrays representing a top-down view of the arrays
-    supplied.  The first array is an array of strings, and represents the
+    supplied.  The first array is an array of tiles, and represents the
     top-down view; the second is an array of integers, whose contents
     represent which array each character in the first array came from.
 
@@ -65,20 +65,16 @@ def overlay(arrays, heights):
         raise ValueError("There are %d arrays, but there are %d heights!"
                          % (len(arrays), len(heights)))
 
-    trans = config.TRANSPARENT_GLYPH
+    trans = symbol.TRANSPARENT_TILE
     composite_array = empty_str_array(arrays[0].shape)
     height_array = numpy.zeros(arrays[0].shape, 'i')
-    reversed_arrays = list(arrays)
-    reversed_arrays.reverse()
-    reversed_heights = list(heights)
-    reversed_heights.reverse()
-
-    for i in range(len(reversed_arrays)):
-        for x in range(reversed_arrays[0].shape[0]):
-            for y in range(reversed_arrays[0].shape[1]):
-                if reversed_arrays[i][x,y] != trans:
-                    composite_array[x,y] = reversed_arrays[i][x,y]
-                    height_array[x,y] = reversed_heights[i]
+
+# Paint the arrays from the bottom up, so that each array covers those beneath
+# it wherever it is not transparent.
+    for i in reversed(range(len(arrays))):
+        opaque = arrays[i] != trans
+        composite_array[opaque] = arrays[i][opaque]
+        height_array[opaque] = heights[i]
 
     return (composite_array, height_array)
 
@@ -86,17 +82,15 @@ def fovize(arr, view, memory_arr = None, memory = None, memory_color = (0, 0, 0)
     """
     Returns a copy of arr with only the points in view visible.
 
-    Note that despite its wide scope, this function should be fairly fast.
-
     If memory_arr is provided, then if a coordinate is not in "view" but is in
     "memory," a colored version of that coordinate in memory_arr is displayed
     instead.
 
     arr - an array.
-    view - an iterable object full of points (tuples of coordinates).  Normally
-        this is a fov object, but that is not necessary.
+    view - a boolean array the shape of arr, True wherever arr is visible.
     memory_arr - an array.
-    memory - an iterable object full of points.
+    memory - a boolean array the shape of arr, True wherever memory_arr is
+        remembered.
     memory_color - the color which displayed things from memory will be painted.
 
     Returns - a copy of arr, except that each point in arr which is not in view
@@ -104,27 +98,23 @@ def fovize(arr, view, memory_arr = None, memory = None, memory_color = (0, 0, 0)
         in memory_arr, if applicable.
     """
 
-    ret_array = empty_str_array(arr.shape)
-    for coord in view:
-        ret_array[coord] = arr[coord]
+    ret_array = numpy.where(view, arr, symbol.TRANSPARENT_TILE)
+    ret_array = ret_array.astype(symbol.TILE_TYPE)
 
-    for coord in memory:
-        if coord not in view:
-            ret_array[coord] = symbol.Glyph(memory_arr[coord].char, memory_color)
+    if memory_arr is not None and memory is not None:
+        remembered = memory & ~view
+        recolor = symbol.palette.getRecolored(memory_color)
+        ret_array[remembered] = recolor[memory_arr[remembered]]
 
     return ret_array
 
 def empty_str_array(dimensions):
     """
     Return an array such that empty_str_array(x,y).shape == (x,y) and with
-    appropriate a,b, empty_str_array(x,y)[a,b] == config.TRANSPARENT_GLYPH.
+    appropriate a,b, empty_str_array(x,y)[a,b] == symbol.TRANSPARENT_TILE.
     """
 
-    ret_array = numpy.empty(dimensions, 'O')
-    for x in range(dimensions[0]):
-        for y in range(dimensions[1]):
-            ret_array[x,y] = config.TRANSPARENT_GLYPH
-    return ret_array
+    return numpy.zeros(dimensions, symbol.TILE_TYPE)
 
 def print_str_to_end_of_line(initial_coords, string_used, array, color = (255, 255, 255)):
     """
@@ -138,7 +128,7 @@ def print_str_to_end_of_line(initial_coords, string_used, array, color = (255, 2
     initial_coords - the coordinates to which the first character of the
         string should be printed.
     string_used - the string printed to the array.
-    array - the array of characters (1-character strings) to which the
+    array - the array of characters to which the
         string is printed.
     color - the color of the text being printed.
     """
@@ -176,7 +166,7 @@ def print_str(initial_coords, string_used, array, color = (255, 255, 255)):
         % (len(string_used), initial_coords[0], array.shape[0]))
 
     for i in range(len(string_used)):
-        array[initial_coords[0] + i, initial_coords[1]] = symbol.Glyph(string_used[i], (color[0], color[1], color[2]))
+        array[initial_coords[0] + i, initial_coords[1]] = symbol.tile(symbol.Glyph(string_used[i], (color[0], color[1], color[2])))
 
     return
 
@@ -268,10 +258,10 @@ def copy_array_subset(src_nw_corner, dst_nw_corner, block_dims,
                                    dst_nw_corner, block_dims),
                    (-1, -1)), dst_array.shape)
 
-    for x in range(block_dims[0]):
-        for y in range(block_dims[1]):
-            dst_array[coordinates.add(dst_nw_corner, (x,y))] = \
-                src_array[coordinates.add(src_nw_corner, (x,y))]
+    dst_array[dst_nw_corner[0]:dst_nw_corner[0] + block_dims[0],
+              dst_nw_corner[1]:dst_nw_corner[1] + block_dims[1]] = \
+        src_array[src_nw_corner[0]:src_nw_corner[0] + block_dims[0],
+                  src_nw_corner[1]:src_nw_corner[1] + block_dims[1]]
 
     return
 
@@ -298,7 +288,7 @@ def copy_array(array_to_copy):
 
 def fill_rect(array, nw_corner, se_corner, val):
     """
-    Fill a rectangle in an array with a certain symbol.
+    Fill a rectangle in an array with a certain tile.
 
     array - the array to be modified.
     nw_corner - the northwest corner of the rectangle to be filled.
@@ -312,6 +302,4 @@ def fill_rect(array, nw_corner, se_corner, val):
         raise ValueError("Southeast corner %s too low for array of shape %s"
             % (se_corner, array.shape))
 
-    for i in range(nw_corner[0], se_corner[0] + 1):
-        for j in range(nw_corner[1], se_corner[1] + 1):
-            array[i,j] = val
+    array[nw_corner[0]:se_corner[0] + 1, nw_corner[1]:se_corner[1] + 1] = val
@@ -0,0 +1,464 @@
+"""
+Plays many games at once with bots at the keyboard, and reports on how they
+went: how fast the game runs, how far the bots get, and what kills them.
+
+Run this module directly to play a batch of games:
+
+    python batch.py [runs [processes [policy [max_turns [fov_backend]]]]]
+
+Each game is played in a worker process with the screen turned off
+(tcod_display.NullRenderer) and a bot as kb.source, through the same
+Player.getAction() code the keyboard goes through.  Each worker writes its
+saves to a directory of its own, so that games do not overwrite each other's.
+
+Fields of view are calculated with fov.ShadowcastingBackend unless another
+backend is named, on the command line or in the environment variable
+fov.BACKEND_VARIABLE, so that batches need nothing from libtcod.
+"""
+
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import tcod_display as display
+import config
+import coordinates
+import exc
+import fileio
+import fov
+import kb
+import level
+import mapgen
+import metrics
+import pc
+import pf
+import rng
+
+kp = kb.kp
+
+RUNS = 100
+MAX_TURNS = 5000
+# The number of keys in a row a bot may press on the main screen without any
+# game time passing before its game is given up as stalled.
+MAX_IDLE_KEYS = 200
+PLAYER_NAME = "John Stenibeck"
+FOV_BACKEND = "shadowcasting"
+
+# The movement keys, in a fixed order, and the keys for each direction.
+WALK_KEYS = sorted(config.DIRECTION_SWITCH.keys())
+DIRECTION_KEYS = dict((direction, key) for (key, direction)
+                      in config.DIRECTION_SWITCH.items())
+
+class Bot(object):
+    """
+    A program which plays the game, one key at a time.
+
+    A Bot is called with the mode of each key kb asks for, and returns a kp
+    code, so it can be given to kb.CallbackInput.  By default it declines
+    every question.
+
+    A bot which presses MAX_IDLE_KEYS keys in a row on the main screen without
+    any game time passing raises exc.InputExhausted, so that a bot which
+    cannot make progress stops its game rather than hanging it.
+
+    Fields:
+    player - the Player the bot is playing.
+    random - a random.Random of the bot's own, so that the bot's choices do
+        not disturb the game's random numbers.
+    idle_keys - the number of keys in a row pressed on the main screen on the
+        same Level at the same time.
+    """
+
+# Private state:
+# __last_moment - a pair (Level, time) of when the last key was pressed on the
+#     main screen, or None if none has been.
+
+    def __init__(self, player, seed):
+        self.player = player
+        self.random = random.Random(seed)
+        self.idle_keys = 0
+        self.__last_moment = None
+
+    def __call__(self, mode):
+        if mode == "main":
+            self.checkIdle()
+            return self.mainKey()
+        elif mode == "card":
+            return self.cardKey()
+        elif mode == "boolean":
+            return kp.NO
+        else:
+            return kp.ESCAPE
+
+    def checkIdle(self):
+        """
+        Count a key pressed on the main screen, and raise exc.InputExhausted
+        if too many have been pressed without any game time passing.
+        """
+
+        level_ = self.player.currentLevel
+        moment = (level_, level_.time)
+        if moment == self.__last_moment:
+            self.idle_keys += 1
+        else:
+            self.idle_keys = 0
+            self.__last_moment = moment
+
+        if self.idle_keys >= MAX_IDLE_KEYS:
+            raise exc.InputExhausted(
+                "%d keys were pressed without any time passing."
+                % self.idle_keys)
+
+    def mainKey(self):
+        """
+        Return the key to press on the main screen.
+        """
+
+        raise NotImplementedError("Only implemented by Bot's children.")
+
+    def cardKey(self):
+        """
+        Return the key to press when asked for a card.
+        """
+
+        return kp.ESCAPE
+
+class RandomWalker(Bot):
+    """
+    Walks, attacks and waits at random.
+    """
+
+    def mainKey(self):
+        return self.random.choice(WALK_KEYS + [kp.WAIT])
+
+class StairsSeeker(Bot):
+    """
+    Heads for the up staircase by the shortest path, attacking anything in
+    reach and healing when badly hurt.  Where there is no staircase, it walks
+    at random.
+    """
+
+# Private state:
+# __stairs_level - the Level __stairs was found on.
+# __stairs - the coordinates of the up staircase on __stairs_level, or None if
+#     it has none.
+
+    def __init__(self, player, seed):
+        Bot.__init__(self, player, seed)
+        self.__stairs_level = None
+        self.__stairs = None
+
+    def mainKey(self):
+        level_ = self.player.currentLevel
+        coords = self.player.coords
+
+        for key in WALK_KEYS:
+            target = coordinates.add(coords, config.DIRECTION_SWITCH[key])
+            if target in level_.dudeLayer:
+                return key
+
+        if self.player.cur_HP * 3 < self.player.max_HP \
+            and len(self.player.deck.hand) > 0:
+
+            return kp.HEAL
+
+# A stuck player's moves take no time, so they would never wear the condition
+# off.
+        if self.player.hasCondition("stuck"):
+            return kp.WAIT
+
+        stairs = self.stairs(level_)
+        if stairs is None:
+            return self.random.choice(WALK_KEYS)
+        if stairs == coords:
+            return kp.UP
+
+        path = pf.find_shortest_path(level_, coords, stairs)
+        if len(path) < 2:
+            return kp.WAIT
+        return DIRECTION_KEYS[coordinates.subtract(path[1], path[0])]
+
+    def cardKey(self):
+# The only card asked for is the one to heal with.
+        return kp.CARD_1
+
+    def stairs(self, level_):
+        """
+        Return the coordinates of the up staircase on level_, or None.
+        """
+
+        if level_ is not self.__stairs_level:
+            self.__stairs_level = level_
+            self.__stairs = None
+            for (coords, glyph) in level_.elements.items():
+                if glyph == level.UPSTAIRS_GLYPH:
+                    self.__stairs = coords
+                    break
+        return self.__stairs
+
+# The bots, by the names batches are run with.
+POLICIES = {
+    "random" : RandomWalker,
+    "stairs" : StairsSeeker,
+}
+
+class RunStats(object):
+    """
+    What happened in one game.
+
+    Fields:
+    seed - the seed the game was played with.
+    policy - the name of the bot which played it.
+    outcome - "death", "saved", "out of turns", or "stalled" if the bot could
+        not make any time pass.
+    floor - the floor the game ended on.
+    turns - the number of turns the player took.
+    ticks - the number of ticks of game time that passed, on every floor.
+    seconds - the wall-clock time the game took to play.
+    killer - the name of what killed the player, or None if nothing did.
+    """
+
+    def __init__(self, seed, policy):
+        self.seed = seed
+        self.policy = policy
+        self.outcome = None
+        self.floor = 1
+        self.turns = 0
+        self.ticks = 0
+        self.seconds = 0.0
+        self.killer = None
+
+def play(floor_defs, policy, seed, max_turns = MAX_TURNS):
+    """
+    Play one game to its end with a bot at the keyboard.
+
+    This changes kb.source, and writes saves to fileio.save_directory.
+
+    floor_defs - the floor definitions, as from fileio.getFloorDefinitions().
+    policy - the name of the bot to play, a key of POLICIES.
+    seed - the seed the game's rng.Streams are made from.
+    max_turns - the number of turns after which the game is abandoned.
+
+    Returns: a RunStats for the game.
+    """
+
+    stats = RunStats(seed, policy)
+    streams = rng.streams(seed)
+    player = pc.Player(PLAYER_NAME, (40, 40))
+    kb.source = kb.CallbackInput(POLICIES[policy](player, seed))
+
+    start = time.time()
+    curlev = mapgen.nextLevel(floor_defs, 1, player, streams)
+    try:
+        while stats.outcome is None:
+            if stats.turns >= max_turns:
+                stats.outcome = "out of turns"
+                break
+
+            try:
+                curlev.next()
+                if curlev.current_actor is player:
+                    stats.turns += 1
+# Level changes and deaths end the turn they happen in; count it anyway.
+            except exc.LevelChange:
+                stats.turns += 1
+                stats.ticks += curlev.time
+                stats.floor = curlev.floor + 1
+                player.clearMemory()
+                fileio.save_game(player, stats.floor)
+                curlev.close()
+                curlev = mapgen.nextLevel(floor_defs, stats.floor, player,
+                                          streams)
+                player.clearMemory()
+                curlev.messages.append("Welcome to the next floor!")
+                player.levelUp()
+            except exc.SavingLevelChange:
+                stats.turns += 1
+                stats.outcome = "saved"
+            except exc.PlayerDeath:
+                stats.turns += 1
+                stats.outcome = "death"
+                stats.killer = metrics.actor_name(curlev.current_actor)
+            except exc.InputExhausted:
+                stats.outcome = "stalled"
+    finally:
+        stats.ticks += curlev.time
+        curlev.close()
+        stats.seconds = time.time() - start
+
+    return stats
+
+# The floor definitions, loaded once by each worker.
+_floor_defs = None
+
+def _init_worker(save_root, fov_backend):
+    """
+    Prepare a process to play games: turn off the screen, choose the fov
+    backend named fov_backend, load the floors, and give the process a save
+    directory of its own under save_root.
+    """
+
+    global _floor_defs
+
+    display.renderer = display.NullRenderer()
+    display.init()
+    fov.use_backend(fov_backend)
+    fileio.save_directory = tempfile.mkdtemp(prefix = "worker-",
+                                             dir = save_root)
+    monster_factory = fileio.getMonsterFactory(
+                      fileio.getFile("monsters.dat"))
+    _floor_defs = fileio.getFloorDefinitions(
+                  monster_factory,
+                  fileio.getFile("levels.dat"))
+
+def _play_run(run):
+    """
+    Play a game in a worker.  run is a tuple (policy, seed, max_turns).
+    """
+
+    (policy, seed, max_turns) = run
+    return play(_floor_defs, policy, seed, max_turns)
+
+def run_batch(seeds, policy = "stairs", processes = None, max_turns = MAX_TURNS,
+              fov_backend = FOV_BACKEND):
+    """
+    Play a game for each seed, spread over a pool of processes.
+
+    seeds - the seeds of the games to be played.
+    policy - the name of the bot to play every game, a key of POLICIES.
+    processes - the number of worker processes, or None for one per CPU.  If
+        1, the games are played in this process, which is left with the
+        screen turned off.
+    max_turns - the number of turns after which a game is abandoned.
+    fov_backend - the name of the fov backend to play with, a key of
+        fov.BACKENDS.
+
+    Returns: a list of the RunStats of the games, in the order of seeds.
+    """
+
+    if policy not in POLICIES:
+        raise ValueError("There is no bot policy named %s." % policy)
+    if fov_backend not in fov.BACKENDS:
+        raise ValueError("There is no fov backend named %s." % fov_backend)
+
+    runs = [(policy, seed, max_turns) for seed in seeds]
+    save_root = tempfile.mkdtemp(prefix = "batch-")
+    try:
+        if processes == 1:
+            _init_worker(save_root, fov_backend)
+            return map(_play_run, runs)
+
+        pool = multiprocessing.Pool(processes, _init_worker,
+                                    (save_root, fov_backend))
+        try:
+            return pool.map(_play_run, runs, 1)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        shutil.rmtree(save_root, True)
+
+class BatchReport(object):
+    """
+    The totals of the RunStats of a batch of games.
+
+    Fields:
+    runs - the RunStats of the games.
+    turns - the number of turns taken in every game.
+    ticks - the number of ticks passed in every game.
+    seconds - the wall-clock time spent playing every game, added together.
+    outcomes - a dict of the number of games with each outcome.
+    deaths - a dict of the number of deaths caused by each killer.
+    floors - a dict of the number of games which ended on each floor.
+    """
+
+    def __init__(self, runs):
+        self.runs = runs
+        self.turns = sum(run.turns for run in runs)
+        self.ticks = sum(run.ticks for run in runs)
+        self.seconds = sum(run.seconds for run in runs)
+        self.outcomes = {}
+        self.deaths = {}
+        self.floors = {}
+        for run in runs:
+            self.outcomes[run.outcome] = self.outcomes.get(run.outcome, 0) + 1
+            if run.killer is not None:
+                self.deaths[run.killer] = self.deaths.get(run.killer, 0) + 1
+            self.floors[run.floor] = self.floors.get(run.floor, 0) + 1
+
+    def turnsPerSecond(self):
+        """
+        Return the number of turns played per second of one process's time.
+        """
+
+        if self.seconds == 0:
+            return 0.0
+        return self.turns / self.seconds
+
+    def secondsPerTurn(self):
+        """
+        Return the mean wall-clock time a turn took.
+        """
+
+        if self.turns == 0:
+            return 0.0
+        return self.seconds / self.turns
+
+    def clearRate(self, floor):
+        """
+        Return the fraction of games which got past the floor given.
+        """
+
+        if len(self.runs) == 0:
+            return 0.0
+        cleared = len([run for run in self.runs if run.floor > floor])
+        return float(cleared) / len(self.runs)
+
+    def lines(self):
+        """
+        Return the report as a list of lines of text.
+        """
+
+        ret_lines = [
+            "%d games, %d turns, %d ticks" % (len(self.runs), self.turns,
+                                             self.ticks),
+            "%.0f turns per second, %.3fms per turn" % (self.turnsPerSecond(),
+                self.secondsPerTurn() * 1000),
+            "outcomes: %s" % ", ".join("%s %d" % pair
+                                       for pair in sorted(self.outcomes.items())),
+        ]
+        for floor in sorted(self.floors):
+            ret_lines.append("floor %d: %d games ended here, %.1f%% cleared"
+                % (floor, self.floors[floor], self.clearRate(floor) * 100))
+        for (killer, count) in sorted(self.deaths.items(),
+                                      key = lambda pair: (-pair[1], pair[0])):
+            ret_lines.append("killed by %s: %d" % (killer, count))
+        return ret_lines
+
+def main(args):
+    """
+    Play a batch of games and print a report.
+
+    args - [runs [processes [policy [max_turns [fov_backend]]]]], as strings.
+    """
+
+    runs = int(args[0]) if len(args) > 0 else RUNS
+    processes = int(args[1]) if len(args) > 1 else None
+    policy = args[2] if len(args) > 2 else "stairs"
+    max_turns = int(args[3]) if len(args) > 3 else MAX_TURNS
+    fov_backend = args[4] if len(args) > 4 \
+        else os.environ.get(fov.BACKEND_VARIABLE, FOV_BACKEND)
+
+    start = time.time()
+    report = BatchReport(run_batch(range(runs), policy, processes, max_turns,
+                                   fov_backend))
+    for line in report.lines():
+        print line
+    print "%.1f seconds elapsed" % (time.time() - start)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,772 @@
+"""
+Benchmarks for the parts of the game which run every turn or every frame.
+
+There are two kinds.  The comparisons (BENCHMARKS) measure a piece of the game
+against the slower implementation it replaced, and print the speedup.  The
+scenarios (SCENARIOS) play out the same way every run, with fixed seeds, and
+are timed in seconds per operation: per level generated, per turn taken, per
+path found, and so on.  Their results can be saved and compared against those
+of an earlier run to catch regressions.
+
+Run this module directly to run them:
+
+    python benchmark.py [comparison ...]
+    python benchmark.py --scenarios [--save FILE] [--baseline FILE]
+                        [--threshold T] [--repeat N] [--fov BACKEND]
+                        [scenario ...]
+
+With --baseline, any scenario more than T (by default 0.2, that is, 20%)
+slower than it was in the baseline is reported as a regression, and the
+module exits with status 1.  Scenarios calculate fields of view with
+batch.FOV_BACKEND unless --fov or the environment variable
+fov.BACKEND_VARIABLE names another backend.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy
+
+import tcod_display as display
+import arrays
+import batch
+import config
+import symbol
+import exc
+import fileio
+import fov
+import kb
+import level
+import mapgen
+import pc
+import pf
+import rng
+
+OVERLAY_DIMENSIONS = ((120, 120), (240, 240), (480, 480))
+DISPLAY_FRAMES = 300
+PATHFINDING_DIMENSIONS = ((60, 40), (120, 80), (240, 160))
+PATHFINDING_SEARCHES = 20
+FOV_LEVELS = 20
+FOV_VIEWPOINTS = 50
+
+FORMAT_VERSION = 1
+THRESHOLD = 0.2
+REPEAT = 3
+
+MAPGEN_FLOORS = range(1, 8)
+TURN_FLOOR = 3
+TURNS = 2000
+TURN_MONSTER_COUNTS = (10, 50)
+SCENARIO_LEVELS = 5
+OVERLAY_REPETITIONS = 100
+RENDER_FRAMES = 50
+
+def time_call(function, repetitions):
+    """
+    Return the average number of seconds function() takes to run.
+
+    function - a function taking no arguments.
+    repetitions - the number of times function is called.
+    """
+
+    start = time.time()
+    for i in range(repetitions):
+        function()
+    return (time.time() - start) / repetitions
+
+def reference_overlay(arrays_, heights):
+    """The cell-by-cell implementation arrays.overlay() used to have."""
+
+    trans = symbol.TRANSPARENT_TILE
+    composite_array = arrays.empty_str_array(arrays_[0].shape)
+    height_array = numpy.zeros(arrays_[0].shape, 'i')
+
+    for i in reversed(range(len(arrays_))):
+        for x in range(arrays_[i].shape[0]):
+            for y in range(arrays_[i].shape[1]):
+                if arrays_[i][x,y] != trans:
+                    composite_array[x,y] = arrays_[i][x,y]
+                    height_array[x,y] = heights[i]
+
+    return (composite_array, height_array)
+
+def random_layers(dimensions, seed = 0):
+    """
+    Return the layers of a plausible Level: a few effects, some dudes, a few
+    elements, and a dungeon about a third of which is floor.
+
+    Returns - a pair, containing a list of arrays of tiles and a list of their
+        heights.
+    """
+
+    state = numpy.random.RandomState(seed)
+    tiles = [symbol.tile(symbol.Glyph(c, (255, 255, 255))) for c in ".#@<`"]
+
+    def sparse_layer(tile, density):
+        layer = arrays.empty_str_array(dimensions)
+        layer[state.random_sample(dimensions) < density] = tile
+        return layer
+
+    dungeon = sparse_layer(tiles[0], 0.3)
+    dungeon[state.random_sample(dimensions) < 0.05] = tiles[1]
+    return ([sparse_layer(tiles[4], 0.001), sparse_layer(tiles[2], 0.005),
+             sparse_layer(tiles[3], 0.0005), dungeon], [-1, 2, 5, 8])
+
+def bench_overlay(dimensions_list = OVERLAY_DIMENSIONS, repetitions = 3):
+    """
+    Compare arrays.overlay() with reference_overlay() on random Levels.
+
+    Returns - a list of tuples of the form (dimensions, reference seconds,
+        vectorized seconds).
+    """
+
+    results = []
+    for dimensions in dimensions_list:
+        (layers, heights) = random_layers(dimensions)
+        expected = reference_overlay(layers, heights)
+        actual = arrays.overlay(layers, heights)
+        assert (expected[0] == actual[0]).all()
+        assert (expected[1] == actual[1]).all()
+
+        reference_time = time_call(
+            lambda: reference_overlay(layers, heights), repetitions)
+        vectorized_time = time_call(
+            lambda: arrays.overlay(layers, heights), repetitions * 100)
+        results.append((dimensions, reference_time, vectorized_time))
+
+    return results
+
+def random_screens(count, changes_per_screen = 40, seed = 0):
+    """
+    Return a list of count screen-sized arrays of tiles, each of which differs
+    from the one before it in about changes_per_screen cells, much as the
+    screen does while the player walks around.
+    """
+
+    state = numpy.random.RandomState(seed)
+    tiles = [symbol.tile(symbol.Glyph(c,
+                 tuple([int(i) for i in state.randint(0, 256, 3)])))
+             for c in ".#@<`abcdefgh"]
+
+    screen = numpy.array(tiles, symbol.TILE_TYPE)[
+        state.randint(0, len(tiles), config.DEFAULT_DIMENSIONS)]
+    screens = []
+    for i in range(count):
+        screen = screen.copy()
+        xs = state.randint(0, screen.shape[0], changes_per_screen)
+        ys = state.randint(0, screen.shape[1], changes_per_screen)
+        screen[xs, ys] = numpy.array(tiles, symbol.TILE_TYPE)[
+            state.randint(0, len(tiles), changes_per_screen)]
+        screens.append(screen)
+
+    return screens
+
+def bench_display(frame_count = DISPLAY_FRAMES):
+    """
+    Measure the frames per second tcod_display can put on the console, with
+    each cell printed every frame (as it used to be), with only changed
+    cells printed, and with colors uploaded in bulk.
+
+    This opens the game window.
+
+    Returns - a list of pairs of the form (name of the method, frames per
+        second).
+    """
+
+    screens = random_screens(frame_count)
+    display.init()
+    old_bulk_upload = display.BULK_UPLOAD
+
+    def show_all(full_redraw):
+        for screen in screens:
+            if full_redraw:
+                display.invalidate()
+            display.display_array(screen)
+
+    results = []
+    for (name, bulk_upload, full_redraw) in (
+        ("per-cell, full redraw", False, True),
+        ("per-cell, changed cells", False, False),
+        ("bulk upload", True, False)):
+
+        display.BULK_UPLOAD = bulk_upload
+        display.invalidate()
+        seconds = time_call(lambda: show_all(full_redraw), 1)
+        results.append((name, frame_count / seconds))
+
+    display.BULK_UPLOAD = old_bulk_upload
+    return results
+
+def reference_shortest_path(dimensions, adjacent_squares_function, source, destination):
+    """The breadth-first search pf._find_shortest_path() used to do."""
+
+    try:
+        predecessors = pf._breadth_first_search_predecessors(dimensions,
+            adjacent_squares_function, source, destination)
+    except exc.PathfindingError:
+        return None
+
+    path = []
+    current_square = destination
+    while predecessors[current_square] is not None:
+        path.insert(0, current_square)
+        current_square = predecessors[current_square]
+    path.insert(0, source)
+    return path
+
+def random_searches(dimensions, count, seed = 0):
+    """
+    Return a grid of rooms joined by corridors, roughly as mapgen makes them,
+    and count pairs of squares in it to find paths between.
+
+    Returns - a pair, containing an adjacent_squares_function for the grid and
+        a list of (source, destination) pairs.
+    """
+
+    state = numpy.random.RandomState(seed)
+    passable = numpy.zeros(dimensions, bool)
+    centers = []
+    for i in range(dimensions[0] * dimensions[1] / 300):
+        (w, h) = state.randint(3, 10, 2)
+        x = state.randint(1, dimensions[0] - w - 1)
+        y = state.randint(1, dimensions[1] - h - 1)
+        passable[x:x + w, y:y + h] = True
+        centers.append((x + w / 2, y + h / 2))
+    for (start, end) in zip(centers, centers[1:]):
+        passable[min(start[0], end[0]):max(start[0], end[0]) + 1, start[1]] = True
+        passable[end[0], min(start[1], end[1]):max(start[1], end[1]) + 1] = True
+
+    move_masks = level.make_move_masks(passable)
+    def adjacent_squares_function(square):
+        return [(square[0] + d[0], square[1] + d[1])
+                for d in level.MOVES_BY_MASK[move_masks[square]]]
+
+    pairs = [(centers[state.randint(len(centers))],
+              centers[state.randint(len(centers))]) for i in range(count)]
+    return (adjacent_squares_function, pairs)
+
+def bench_pathfinding(dimensions_list = PATHFINDING_DIMENSIONS,
+                      searches = PATHFINDING_SEARCHES):
+    """
+    Compare pf._find_shortest_path() with reference_shortest_path() on
+    random maps.
+
+    Returns - a list of tuples of the form (dimensions, reference seconds,
+        A* seconds), the times being per search.
+    """
+
+    results = []
+    for dimensions in dimensions_list:
+        (adjacent_squares_function, pairs) = random_searches(dimensions, searches)
+
+        def search_all(search):
+            for (source, destination) in pairs:
+                try:
+                    search(dimensions, adjacent_squares_function, source, destination)
+                except exc.PathfindingError:
+                    pass
+
+        for (source, destination) in pairs:
+            expected = reference_shortest_path(dimensions,
+                adjacent_squares_function, source, destination)
+            try:
+                actual = pf._find_shortest_path(dimensions,
+                    adjacent_squares_function, source, destination)
+            except exc.PathfindingError:
+                actual = None
+            assert (expected is None) == (actual is None)
+            assert expected is None or len(expected) == len(actual)
+
+        reference_time = time_call(
+            lambda: search_all(reference_shortest_path), 1) / len(pairs)
+        astar_time = time_call(
+            lambda: search_all(pf._find_shortest_path), 1) / len(pairs)
+        results.append((dimensions, reference_time, astar_time))
+
+    return results
+
+def random_level(dimensions, floor_density, seed = 0):
+    """
+    Return a Level whose dungeon is a random scattering of floor and walls.
+    """
+
+    state = numpy.random.RandomState(seed)
+    dungeon = arrays.empty_str_array(dimensions)
+    dungeon[state.random_sample(dimensions) < floor_density] = \
+        level.ROOM_INTERIOR_TILE
+    return level.Level(dimensions, 0, None, level.empty_elements(dimensions),
+        dungeon, None)
+
+def bench_fov(level_count = FOV_LEVELS, viewpoints = FOV_VIEWPOINTS):
+    """
+    Check that every fov backend sees the same squares from random viewpoints
+    on random Levels, and measure how long each takes.
+
+    This needs libtcod.
+
+    Returns - a list of pairs of the form (name of the backend, seconds per
+        field of view).
+    """
+
+    state = numpy.random.RandomState(0)
+    levels = [random_level(config.MAP_DIMENSIONS, state.uniform(0.3, 1.0), i)
+              for i in range(level_count)]
+    corpus = [(level_, [(state.randint(level_.dimensions[0]),
+                         state.randint(level_.dimensions[1]))
+                        for j in range(viewpoints)])
+              for level_ in levels]
+    backends = (("libtcod", fov.TCODBackend()),
+                ("shadowcasting", fov.ShadowcastingBackend()))
+
+    for (level_, points) in corpus:
+        expected = backends[0][1].visibleMasks(level_, points, fov.FOV_RADIUS)
+        for (name, backend) in backends[1:]:
+            actual = backend.visibleMasks(level_, points, fov.FOV_RADIUS)
+            assert (expected == actual).all(), name
+
+    def view_all(backend):
+        for (level_, points) in corpus:
+            backend.visibleMasks(level_, points, fov.FOV_RADIUS)
+
+    results = [(name, time_call(lambda: view_all(backend), 1)
+                      / (level_count * viewpoints))
+               for (name, backend) in backends]
+
+    for level_ in levels:
+        level_.close()
+    return results
+
+def reference_sight_map(dungeon):
+    """The cell-by-cell construction level.make_sight_map() used to do."""
+
+    import libtcodpy as tcod
+
+    smap = tcod.map_new(dungeon.shape[0], dungeon.shape[1])
+    for i in range(dungeon.shape[0]):
+        for j in range(dungeon.shape[1]):
+            tcod.map_set_properties(smap, i, j,
+                dungeon[i, j] in level.OPEN_TILES, False)
+    return smap
+
+def bench_sight_map(dimensions_list = OVERLAY_DIMENSIONS, repetitions = 3):
+    """
+    Compare level.make_sight_map() with reference_sight_map().
+
+    This needs libtcod.
+
+    Returns - a list of tuples of the form (dimensions, reference seconds,
+        bulk seconds).
+    """
+
+    import libtcodpy as tcod
+
+    results = []
+    for dimensions in dimensions_list:
+        dungeon = random_layers(dimensions)[0][-1]
+        transparent = level.transparent_mask(dungeon)
+
+        expected = reference_sight_map(dungeon)
+        actual = level.make_sight_map(transparent)
+        for i in range(dimensions[0]):
+            for j in range(dimensions[1]):
+                assert tcod.map_is_transparent(expected, i, j) \
+                    == tcod.map_is_transparent(actual, i, j)
+        tcod.map_delete(expected)
+        tcod.map_delete(actual)
+
+        reference_time = time_call(
+            lambda: tcod.map_delete(reference_sight_map(dungeon)), repetitions)
+        bulk_time = time_call(
+            lambda: tcod.map_delete(level.make_sight_map(transparent)),
+            repetitions * 100)
+        results.append((dimensions, reference_time, bulk_time))
+
+    return results
+
+def print_overlay():
+    for (dimensions, reference_time, vectorized_time) in bench_overlay():
+        print "overlay %dx%d: reference %.2fms, vectorized %.3fms (%.0fx)" % (
+            dimensions[0], dimensions[1], reference_time * 1000,
+            vectorized_time * 1000, reference_time / vectorized_time)
+
+def print_display():
+    for (name, fps) in bench_display():
+        print "display, %s: %.0f frames per second" % (name, fps)
+
+def print_pathfinding():
+    for (dimensions, reference_time, astar_time) in bench_pathfinding():
+        print "pathfinding %dx%d: breadth-first %.2fms, A* %.2fms (%.1fx)" % (
+            dimensions[0], dimensions[1], reference_time * 1000,
+            astar_time * 1000, reference_time / astar_time)
+
+def print_fov():
+    for (name, seconds) in bench_fov():
+        print "fov, %s: %.3fms per field of view" % (name, seconds * 1000)
+
+def print_sight_map():
+    for (dimensions, reference_time, bulk_time) in bench_sight_map():
+        print "sight map %dx%d: per cell %.2fms, bulk %.3fms (%.0fx)" % (
+            dimensions[0], dimensions[1], reference_time * 1000,
+            bulk_time * 1000, reference_time / bulk_time)
+
+# The comparisons, by name.
+BENCHMARKS = {
+    "overlay" : print_overlay,
+    "display" : print_display,
+    "fov" : print_fov,
+    "pathfinding" : print_pathfinding,
+    "sight_map" : print_sight_map,
+}
+
+def load_floor_defs():
+    """
+    Return the floor definitions the game is played with.
+    """
+
+    monster_factory = fileio.getMonsterFactory(
+                      fileio.getFile("monsters.dat"))
+    return fileio.getFloorDefinitions(
+           monster_factory,
+           fileio.getFile("levels.dat"))
+
+def scenario_levels(floor_defs, count = SCENARIO_LEVELS):
+    """
+    Return count Levels of the floor TURN_FLOOR, each with a player at the
+    entrance, made from the seeds 0 to count - 1.
+    """
+
+    return [mapgen.nextLevel(floor_defs, TURN_FLOOR,
+                             pc.Player(batch.PLAYER_NAME, (40, 40)),
+                             rng.streams(seed))
+            for seed in range(count)]
+
+def passable_squares(level_):
+    """
+    Return a list of the coordinates of every passable square of level_.
+    """
+
+    (xs, ys) = numpy.nonzero(level_.passable)
+    return zip(xs.tolist(), ys.tolist())
+
+def scenario_mapgen(floor_defs):
+    """
+    Generate and populate every floor but the last.
+    """
+
+    def generate():
+        for floor in MAPGEN_FLOORS:
+            mapgen.nextLevel(floor_defs, floor, None,
+                             rng.streams(floor)).close()
+
+    return (time_call(generate, 1), len(MAPGEN_FLOORS))
+
+def turn_level(floor_defs, monster_count, seed):
+    """
+    Return a Level of the floor TURN_FLOOR with monster_count monsters, and a
+    player controlled by a batch.RandomWalker.
+    """
+
+    streams = rng.streams(seed)
+    player = pc.Player(batch.PLAYER_NAME, (40, 40))
+    kb.source = kb.CallbackInput(batch.RandomWalker(player, seed))
+    floor_def = floor_defs[TURN_FLOOR]
+    ret_level = mapgen.constructLevelFromDungeon(
+        mapgen.randomDungeon(streams.mapgen), floor_def, player, streams)
+    mapgen.populate_level(ret_level, floor_def, monster_count)
+    return ret_level
+
+def scenario_turns(floor_defs, monster_count):
+    """
+    Take TURNS turns on Levels with monster_count monsters.  A turn is one
+    call to Level.next(); whenever a game ends, another is begun on a Level
+    made with the next seed, and only the time spent in Level.next() counts.
+    """
+
+    seconds = 0.0
+    turns = 0
+    seed = 0
+    while turns < TURNS:
+        level_ = turn_level(floor_defs, monster_count, seed)
+        seed += 1
+        try:
+            while turns < TURNS:
+                start = time.time()
+                try:
+                    level_.next()
+                except (exc.LevelChange, exc.SavingLevelChange,
+                        exc.PlayerDeath):
+                    break
+                finally:
+                    seconds += time.time() - start
+                    turns += 1
+        finally:
+            level_.close()
+
+    return (seconds, turns)
+
+def scenario_pathfinding(floor_defs):
+    """
+    Find paths between random squares on several Levels.
+    """
+
+    state = numpy.random.RandomState(0)
+    searches = []
+    levels = scenario_levels(floor_defs)
+    for level_ in levels:
+        squares = passable_squares(level_)
+        searches.extend((level_, squares[state.randint(len(squares))],
+                         squares[state.randint(len(squares))])
+                        for i in range(PATHFINDING_SEARCHES))
+
+    def search_all():
+        for (level_, source, destination) in searches:
+            pf.find_shortest_path(level_, source, destination)
+
+    seconds = time_call(search_all, 1)
+    for level_ in levels:
+        level_.close()
+    return (seconds, len(searches))
+
+def scenario_fov(floor_defs):
+    """
+    Calculate fields of view afresh from random squares on several Levels.
+    """
+
+    state = numpy.random.RandomState(0)
+    views = []
+    levels = scenario_levels(floor_defs)
+    for level_ in levels:
+        squares = passable_squares(level_)
+        views.extend((level_, squares[state.randint(len(squares))])
+                     for i in range(FOV_VIEWPOINTS))
+
+    def view_all():
+        view = fov.fov()
+        for (level_, viewpoint) in views:
+            view.invalidate()
+            view.recalculate(level_, viewpoint)
+
+    seconds = time_call(view_all, 1)
+    for level_ in levels:
+        level_.close()
+    return (seconds, len(views))
+
+def scenario_overlay(floor_defs):
+    """
+    Composite the layers of a random Level with arrays.overlay().
+    """
+
+    (layers, heights) = random_layers(OVERLAY_DIMENSIONS[0])
+
+    def overlay_all():
+        for i in range(OVERLAY_REPETITIONS):
+            arrays.overlay(layers, heights)
+
+    return (time_call(overlay_all, 1), OVERLAY_REPETITIONS)
+
+def scenario_fovize(floor_defs):
+    """
+    Hide all but the visible and remembered parts of a random Level with
+    arrays.fovize().
+    """
+
+    state = numpy.random.RandomState(0)
+    (layers, heights) = random_layers(OVERLAY_DIMENSIONS[0])
+    composite = arrays.overlay(layers, heights)[0]
+    view = state.random_sample(OVERLAY_DIMENSIONS[0]) < 0.05
+    memory = view | (state.random_sample(OVERLAY_DIMENSIONS[0]) < 0.3)
+
+    def fovize_all():
+        for i in range(OVERLAY_REPETITIONS):
+            arrays.fovize(composite, view, layers[-1], memory)
+
+    return (time_call(fovize_all, 1), OVERLAY_REPETITIONS)
+
+def scenario_render(floor_defs):
+    """
+    Put together whole screens of several Levels, as the player sees them,
+    and hand them to a renderer which keeps only the last.
+    """
+
+    levels = scenario_levels(floor_defs)
+    for level_ in levels:
+        level_.player.resetFOV()
+
+    def render_all():
+        for level_ in levels:
+            for i in range(RENDER_FRAMES):
+                display.refresh_screen(level_)
+
+    old_renderer = display.renderer
+    display.renderer = display.RecordingRenderer(1)
+    try:
+        seconds = time_call(render_all, 1)
+    finally:
+        display.renderer = old_renderer
+    for level_ in levels:
+        level_.close()
+    return (seconds, len(levels) * RENDER_FRAMES)
+
+def _turns_scenario(monster_count):
+    return lambda floor_defs: scenario_turns(floor_defs, monster_count)
+
+# The scenarios, by name.  Each is a function taking the floor definitions and
+# returning a pair (seconds, number of operations).
+SCENARIOS = {
+    "mapgen" : scenario_mapgen,
+    "pathfinding" : scenario_pathfinding,
+    "fov" : scenario_fov,
+    "overlay" : scenario_overlay,
+    "fovize" : scenario_fovize,
+    "render" : scenario_render,
+}
+SCENARIOS.update(("turns_%d" % count, _turns_scenario(count))
+                 for count in TURN_MONSTER_COUNTS)
+
+def run_scenarios(names = None, repeat = REPEAT,
+                  fov_backend = batch.FOV_BACKEND):
+    """
+    Run the scenarios named, or all of them if names is empty or None, with
+    the fov backend named fov_backend.
+
+    Each scenario is run repeat times, and the fastest run is kept, since the
+    slower ones were slowed by something other than the game.
+
+    Returns: a dict from the name of each scenario to its seconds per
+        operation.
+    """
+
+    if not names:
+        names = sorted(SCENARIOS.keys())
+    for name in names:
+        if name not in SCENARIOS:
+            raise ValueError("There is no scenario named %s." % name)
+
+    old_renderer = display.renderer
+    old_source = kb.source
+    old_backend = fov.backend
+    display.renderer = display.NullRenderer()
+    fov.use_backend(fov_backend)
+    floor_defs = load_floor_defs()
+    results = {}
+    try:
+        for name in names:
+            best = None
+            for i in range(repeat):
+                (seconds, operations) = SCENARIOS[name](floor_defs)
+                per_operation = seconds / operations
+                if best is None or per_operation < best:
+                    best = per_operation
+            results[name] = best
+    finally:
+        display.renderer = old_renderer
+        kb.source = old_source
+        fov.backend = old_backend
+
+    return results
+
+def save_results(results, filename):
+    """
+    Write the results of a run to a JSON file.
+    """
+
+    with open(filename, 'w') as results_file:
+        json.dump({"version" : FORMAT_VERSION, "results" : results},
+                  results_file, indent = 1, sort_keys = True)
+
+def load_results(filename):
+    """
+    Return the results saved to a JSON file by save_results().
+    """
+
+    with open(filename, 'r') as results_file:
+        saved = json.load(results_file)
+    if saved.get("version") != FORMAT_VERSION:
+        raise ValueError("%s is not a version %d results file."
+                         % (filename, FORMAT_VERSION))
+    return saved["results"]
+
+def compare_results(results, baseline, threshold = THRESHOLD):
+    """
+    Compare the results of a run with those of a baseline run.
+
+    threshold - the fraction by which a scenario may be slower than in the
+        baseline before it counts as a regression.
+
+    Returns: a list of tuples of the form (name, baseline seconds, seconds,
+        ratio, is a regression), one for each scenario in both runs.
+    """
+
+    ret_list = []
+    for name in sorted(results.keys()):
+        if name not in baseline:
+            continue
+        ratio = results[name] / baseline[name]
+        ret_list.append((name, baseline[name], results[name], ratio,
+                         ratio > 1 + threshold))
+    return ret_list
+
+def main(args):
+    """
+    Run the comparisons or scenarios named on the command line args, print
+    their results, and return the exit status: 1 if a scenario regressed, 0
+    otherwise.
+    """
+
+    parser = argparse.ArgumentParser(
+        description = "Run comparisons, or scenarios with fixed seeds.")
+    parser.add_argument("names", nargs = "*",
+                        help = "the comparisons or scenarios to run "
+                               "(default: all of them)")
+    parser.add_argument("--scenarios", action = "store_true",
+                        help = "run scenarios rather than comparisons")
+    parser.add_argument("--save", metavar = "FILE",
+                        help = "write the scenarios' results to FILE as JSON")
+    parser.add_argument("--baseline", metavar = "FILE",
+                        help = "compare the scenarios' results with those in "
+                               "FILE")
+    parser.add_argument("--threshold", type = float, default = THRESHOLD,
+                        help = "the fraction slower than the baseline which "
+                               "counts as a regression (default: %(default)s)")
+    parser.add_argument("--repeat", type = int, default = REPEAT,
+                        help = "the number of times to run each scenario "
+                               "(default: %(default)s)")
+    parser.add_argument("--fov", metavar = "BACKEND",
+                        choices = sorted(fov.BACKENDS.keys()),
+                        default = os.environ.get(fov.BACKEND_VARIABLE,
+                                                 batch.FOV_BACKEND),
+                        help = "the fov backend scenarios calculate fields of "
+                               "view with (default: %(default)s)")
+    options = parser.parse_args(args)
+
+    if not options.scenarios:
+        names = options.names or sorted(BENCHMARKS.keys())
+        for name in names:
+            if name not in BENCHMARKS:
+                parser.error("There is no comparison named %s." % name)
+        for name in names:
+            BENCHMARKS[name]()
+        return 0
+
+    results = run_scenarios(options.names, options.repeat, options.fov)
+    if options.save is not None:
+        save_results(results, options.save)
+
+    if options.baseline is None:
+        for name in sorted(results.keys()):
+            print "%s: %.3fms" % (name, results[name] * 1000)
+        return 0
+
+    regressed = False
+    for (name, old, new, ratio, regression) in compare_results(results,
+            load_results(options.baseline), options.threshold):
+        print "%s: %.3fms, baseline %.3fms (%+.1f%%)%s" % (name, new * 1000,
+            old * 1000, (ratio - 1) * 100, " REGRESSION" if regression else "")
+        regressed = regressed or regression
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -49,12 +49,13 @@ class Deck(object):
         self.hand = [card for card in hand_list]
         self.library = [card for card in library_list]
 
-    def randomInsert(self, card):
+    def randomInsert(self, card, stream = rng.DEFAULT):
         """
-        Insert the card given into a random part of the Library.
+        Insert the card given into a random part of the Library, chosen with
+        the rng.RNG stream.
         """
 
-        rng.random_insert(self.library, card)
+        stream.random_insert(self.library, card)
 
     def draw(self):
         """
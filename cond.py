@@ -12,8 +12,17 @@ HASTE_COLOR = (0, 255, 255)
 class Condition(object):
     """
     A condition.
+
+    Fields:
+    fast_forward - True if the condition only repeats a cheap action until
+        something interrupts it, so that the player need not be shown every
+        step.  While such a condition drives the player, the screen is not
+        drawn, nor are messages cleared, until it stops or
+        pc.FAST_FORWARD_TICKS pass.
     """
 
+    fast_forward = False
+
     def __init__(self, time, name):
         """
         Create a new Condition.
@@ -160,6 +169,8 @@ class Resting(Condition):
     This condition is interrupted if there is a monster in sight.
     """
 
+    fast_forward = True
+
     def __init__(self):
         Condition.__init__(self, 200, "resting")
 
@@ -181,6 +192,8 @@ class Running(Condition):
     is something blocking the player's path.
     """
 
+    fast_forward = True
+
     def __init__(self, direction):
         Condition.__init__(self, 200, "running")
         self.direction = direction
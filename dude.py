@@ -10,7 +10,6 @@ import collections
 
 import tcod_display as display
 import exc
-import rng
 import config
 import symbol
 import level
@@ -25,6 +24,11 @@ kp = kb.kp
 
 import log
 
+# The most squares a monster's search for a path may expand in one turn.  A
+# search which would need more gives up and returns no path, and the monster
+# makes do without one until its next turn.
+PATH_NODE_BUDGET = 400
+
 """
 Legal monster tags:
 "proper_noun": this monster's name is a proper noun.
@@ -144,8 +148,10 @@ class Dude(fixedobj.FixedObject):
         Return a list of the possible moves from the current location.
         """
 
-        adjacent_coords = coordinates.adjacent_coords(self.coords)
-        return [x for x in adjacent_coords if self.canMove(x)]
+        dude_layer = self.currentLevel.dudeLayer
+        return [x for x in
+                self.currentLevel.immediately_accessible_squares(self.coords)
+                if x not in dude_layer or dude_layer[x] is self]
     
     def canPass(self, dungeonGlyph):
         return dungeonGlyph in self.passableTerrain
@@ -158,14 +164,27 @@ class Dude(fixedobj.FixedObject):
         return self.cur_HP <= 0
     
     def checkDeath(self):
-        """If dead, die."""
+        """
+        If dead, die.  This is called whenever the dude is hurt, so if the
+        dude lives and is asleep, it is woken.
+        """
         if self.isDead():
             self.die()
+        else:
+            self.currentLevel.wake(self)
     
     def isPlayer(self):
         """Returns True if this Dude is the player, False otherwise."""
         
         return self.getType() == qt.PLAYER
+
+    def isDormant(self):
+        """
+        Return True if the Dude would do nothing but wait until the player
+        comes near or something happens to it, so that it may be put to sleep.
+        """
+
+        return False
     
     def setHP(self, newHP):
         """
@@ -195,6 +214,8 @@ class Dude(fixedobj.FixedObject):
         condition.apply(self)
 # Many conditions change the dude's glyph.
         self.currentLevel.refreshDudeGlyph(self)
+# A sleeping dude must wake to be affected by its condition.
+        self.currentLevel.wake(self)
 
     def removeCondition(self, condition_name):
         """
@@ -242,7 +263,7 @@ class Dude(fixedobj.FixedObject):
                 possible_actions.append(new_action)
 
         if len(possible_actions) > 0:
-            return rng.choice(possible_actions)
+            return self.currentLevel.rng.ai.choice(possible_actions)
         else:
             return None
 
@@ -289,6 +310,10 @@ class Monster(Dude):
 
     def getType(self):
         return qt.MONSTER
+
+    def isDormant(self):
+        return self.state == ais.RESTING and self.AICode != "STATUE" \
+            and len(self.conditions) == 0
     
     def act(self):
         """
@@ -297,7 +322,6 @@ class Monster(Dude):
         Returns: True is the monster has taken a turn via this call,
             False otherwise.
         """
-        self.resetFOV()
 
         cond_action = self.getConditionAction()
         if cond_action is None:
@@ -342,9 +366,10 @@ class Monster(Dude):
         Calculate the action of a monster who sees the player.
         """
 
-        if self.currentLevel.player not in self.fov:
+        if not self.canSeePlayer():
             if self.player_last_location is not None:
 # The player has escaped!  Find a likely square where he could have gone.
+                self.resetFOV()
                 adjacent_coords = coordinates.adjacent_coords(self.player_last_location)
                 legal_coords = [i for i in adjacent_coords 
                     if coordinates.legal(i, self.currentLevel.dimensions)]
@@ -356,12 +381,14 @@ class Monster(Dude):
                 if len(out_of_vision_coords) > 0:
 # There is a possible escape route!  Pursue!
                     self.direction = coordinates.subtract(
-                        rng.choice(out_of_vision_coords), 
+                        self.currentLevel.rng.ai.choice(out_of_vision_coords), 
                         self.player_last_location)
                     self.path = pf.find_shortest_path(self.currentLevel, 
-                        self.coords, self.player_last_location, False)
+                        self.coords, self.player_last_location, False,
+                        PATH_NODE_BUDGET)
                     if self.path == []:
-# There is no route to the player's escape route.  Wait, but stay in
+# There is no route to the player's escape route, or none close enough to be
+# found within the budget.  Wait, but stay in
 # state FIGHTING so as to take advantage of any route that opens up.
                         return action.Wait(self)
                     self.state = ais.TRAVELING
@@ -405,7 +432,7 @@ class Monster(Dude):
         assert self.path != None, \
             "Despite the monster being in state TRAVELING, the path variable is null."
 
-        if self.currentLevel.player in self.fov:
+        if self.canSeePlayer():
             self.state = ais.FIGHTING
             return self.fighting()
         else:
@@ -433,13 +460,13 @@ class Monster(Dude):
                     return self.resting()
                 else:
                     destination = self.path[-1]
-                    self.path = pf.find_shortest_path(self.currentLevel, self.coords, destination, True)
+                    self.path = pf.find_shortest_path(self.currentLevel, self.coords, destination, True, PATH_NODE_BUDGET)
                     if len(self.path) == 0:
-# There simply is no path to the destination!
+# There is no path to the destination, or none found within the budget.
 # Set self.path to only contain the destination, so that next turn, this code
-# attempts to find another path.
+# attempts to find another path, and meanwhile step toward it if possible.
                         self.path = [destination]
-                        return action.Wait(self)
+                        return self.stepToward(destination)
                     elif len(self.path) == 1:
 # This should not happen!
                         assert False
@@ -453,12 +480,30 @@ class Monster(Dude):
                 assert False, "The supposedly legal path contains an illegal move!"
                 return action.Wait(self)
 
+    def stepToward(self, destination):
+        """
+        Return the action of a monster with no path to destination: a move to
+        the adjacent square closest to it, if that is closer than the
+        monster's own, or a Wait otherwise.
+        """
+
+        distance = coordinates.minimumPath(self.coords, destination)
+        possible_moves = [x for x in coordinates.adjacent_coords(self.coords)
+                          if self.currentLevel.canMove(self, x)
+                          and coordinates.minimumPath(x, destination) < distance]
+        if len(possible_moves) == 0:
+            return action.Wait(self)
+
+        move_coords = min(possible_moves,
+            key = lambda x: coordinates.minimumPath(x, destination))
+        return action.Move(self, coordinates.subtract(move_coords, self.coords))
+
     def wandering(self):
         """
         Calculate the action of a monster without a specific goal in mind.
         """
 
-        if self.currentLevel.player in self.fov:
+        if self.canSeePlayer():
             self.state = ais.FIGHTING
             return self.fighting()
 
@@ -482,12 +527,24 @@ class Monster(Dude):
         Return the action of a monster who is just sitting there, doing nothing.
         """
 
-        if self.currentLevel.player in self.fov:
+        if self.canSeePlayer():
             self.state = ais.FIGHTING
             return self.fighting()
         else:
             return action.Wait(self)
 
+    def canSeePlayer(self):
+        """
+        Return True if the monster can see the player, False otherwise.
+
+        Fields of view are close enough to symmetric that this is answered
+        from the player's field of view, which all monsters on the Level
+        share, rather than from the monster's own; the monster's own fov is
+        only calculated when it needs to know what else it can see.
+        """
+
+        return self.currentLevel.playerCanSee(self.coords)
+
     def closeToPlayer(self):
         """
         Pathfind to the player, and attack him if possible.
@@ -497,7 +554,7 @@ class Monster(Dude):
 
 # If adjacent to the player, attack him.
         if coordinates.adjacent(player_location, self.coords):
-            if rng.percentChance(self.specfreq):
+            if self.currentLevel.rng.ai.percentChance(self.specfreq):
                 return action.SpecialMelee(self,
                         self.currentLevel.player,
                         self.spec)
@@ -505,9 +562,18 @@ class Monster(Dude):
                 return action.Attack(self, self.currentLevel.player, 
                     "%(SOURCE_NAME)s attacks %(TARGET_NAME)s! (%(DAMAGE)d)")
 
-# Otherwise, pathfind toward him.
+# Otherwise, step down the Level's distance map toward him.
         else:
-            path = pf.find_shortest_path(self.currentLevel, self.coords, player_location, False)
+            distances = self.currentLevel.playerDistances()
+            if distances[self.coords] == pf.UNREACHABLE:
+                return action.Wait(self)
+
+            next_coords = pf.downhill_step(self.currentLevel, distances, self.coords)
+            if next_coords is not None:
+                return action.Move(self, coordinates.subtract(next_coords, self.coords))
+
+# Every square closer to him is occupied; find a way around the monsters.
+            path = pf.find_shortest_path(self.currentLevel, self.coords, player_location, False, PATH_NODE_BUDGET)
             if path != []:
                 move_coords = coordinates.subtract(path[1], path[0])
                 return action.Move(self, move_coords)
@@ -535,9 +601,10 @@ class Monster(Dude):
         possible.  Otherwise, return None.
         """
         if "two_square_thrower" in self.tags:
-            if self.currentLevel.player in self.fov \
+            if self.canSeePlayer() \
                 and coordinates.minimumPath(self.coords, self.currentLevel.player.coords) in range(1, 4):
                 
+                self.resetFOV()
                 possible_directions = ((2,0),(2,2),(0,2),(-2,2),(-2,0),(-2,-2),(0,-2),(2,-2))
                 possible_targets = [coordinates.add(self.coords, i) for i in possible_directions if self.currentLevel.isEmpty(coordinates.add(self.coords, i))]
                 visible_targets = [coords for coords in possible_targets if coords in self.fov]
@@ -545,7 +612,7 @@ class Monster(Dude):
                 actual_targets = [coords for coords in close_targets if coords not in self.currentLevel.dudeLayer]
                 if len(actual_targets) == 0:
                     return None
-                final_target = rng.choice(actual_targets)
+                final_target = self.currentLevel.rng.ai.choice(actual_targets)
                 return action.ThrowGrenade(self, final_target)
             else:
                 return None
@@ -554,7 +621,7 @@ class Monster(Dude):
                           self.currentLevel.player.coords)
             dist = coordinates.minimumPath(self.coords,
                    self.currentLevel.player.coords)
-            if self.currentLevel.player in self.fov \
+            if self.canSeePlayer() \
                 and direction is not None \
                 and dist < 12:
 
@@ -580,6 +647,7 @@ class Monster(Dude):
         If no such monster exists, then teleport randomly.
         """
 
+        self.resetFOV()
         for d in self.fov.dudes:
             if self.spec == "QUICKEN":
                 if (not d.isPlayer()) and (d.AICode != "STATUE"):
@@ -592,19 +660,25 @@ class Monster(Dude):
             return action.Wait(self)
         
 # If the statue did not do anything to monsters in view, it must teleport.
-        for m in self.currentLevel.dudeLayer:
-            if m.cur_HP < m.max_HP and not m.isPlayer() and (m.AICode != "STATUE"):
-# Aha, a target!
-                destination_candidates = coordinates.adjacent_coords(m.coords)
-                destination_options = [i for i in destination_candidates 
-                    if self.currentLevel.isEmpty(i)
-                    and i not in self.currentLevel.dudeLayer]
-                if destination_options != []:
-                    return action.Teleport(self, rng.choice(destination_options))
+        def destination_options(m):
+            destination_candidates = coordinates.adjacent_coords(m.coords)
+            return [i for i in destination_candidates 
+                if self.currentLevel.isEmpty(i)
+                and i not in self.currentLevel.dudeLayer]
+
+        def is_target(m):
+            return m.cur_HP < m.max_HP and not m.isPlayer() \
+                and (m.AICode != "STATUE") and destination_options(m) != []
+
+# Aha, a target!  Teleport next to the closest one.
+        target = self.currentLevel.dudeLayer.index.nearest(self.coords, is_target)
+        if target is not None:
+            return action.Teleport(self,
+                self.currentLevel.rng.ai.choice(destination_options(target)))
 
 # If there are no monsters to which the statue can teleport, teleport randomly.
         for i in range(100):
-            destination = rng.randomPointInRect((0,0), 
+            destination = self.currentLevel.rng.ai.randomPointInRect((0,0), 
                 (self.currentLevel.dimensions[0] - 1, 
                 self.currentLevel.dimensions[1] - 1))
             if self.currentLevel.isEmpty(destination) and \
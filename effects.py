@@ -9,6 +9,7 @@ import threading
 import config
 import arrays
 import exc
+import symbol
 
 BLINKING_TIME = 0.7
 
@@ -107,7 +108,7 @@ class EffectsMap(object):
 
         ret_array = arrays.empty_str_array(self.dimensions)
         for i in self.__map:
-            ret_array[i] == self.__map[i][0]
+            ret_array[i] = symbol.tile(self.__map[i][0])
         return ret_array
 
     def get(self, coords):
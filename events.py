@@ -33,6 +33,9 @@ class Event(object):
     def isPlayer(self):
         return False
 
+    def isDormant(self):
+        return False
+
     def getType(self):
         return dude.qt.EVENT
 
@@ -75,9 +78,8 @@ class SummoningEvent(Event):
         Check if all enemies are dead. If so, summon new ones.
         """
         
-        for d in self.currentLevel.dudeLayer:
-            if not d.isPlayer():
-                return config.TURN_TICKS
+        if self.currentLevel.dudeLayer.monster_count > 0:
+            return config.TURN_TICKS
 
         action.Summon(self.currentLevel, self.summons_so_far).do()
         self.summons_so_far += 1
@@ -98,8 +100,8 @@ def isEventAtCoords(event_class, coords, level_):
         specified; false otherwise.
     """
 
-    for event in level_.events:
-        if isinstance(event, event_class) and event.coords == coords:
+    for event in level_.event_index.inRect(coords, coords):
+        if isinstance(event, event_class):
             return True
 
     return False
@@ -16,6 +16,9 @@ class SavingLevelChange(Exception):
 class PlayerDeath(Exception):
     """Raised when the player dies."""
 
+class InputExhausted(Exception):
+    """Raised when an input source has no more keys to give."""
+
 class InvalidDataWarning(RuntimeWarning):
     """
     Raised when a dubious situation arises from outside data.
@@ -46,6 +49,11 @@ class TagLocationError(InvalidDataError):
     Raised when a tag cannot be found in a file.
     """
 
+class SaveFormatError(StandardError):
+    """
+    Raised when a save file cannot be read as a save.
+    """
+
 class OccupiedLocationError(StandardError):
     """
     Raised when a location is already occupied.
@@ -13,7 +13,9 @@ import symbol
 import coordinates
 import exc
 import log
-import config # only for TRANSPARENT_GLYPH
+
+# The directory save files are written to.  "" is the working directory.
+save_directory = ""
 
 def save_game(player, floor):
     """
@@ -23,7 +25,8 @@ def save_game(player, floor):
     floor - the floor to which the player is traveling.
     """
 
-    with open("%s.sav" % player.name, 'w') as save_file:
+    save_path = os.path.join(save_directory, "%s.sav" % player.name)
+    with open(save_path, 'w') as save_file:
         cPickle.dump((player, floor), save_file, 0)
 
 def restore_save(filename):
@@ -32,10 +35,25 @@ def restore_save(filename):
 
     Returns: The tuple (player, floor), where player is the player traveling
         upstairs and floor is said player's new floor.
+
+    Raises a SaveFormatError if the file is not a pickle, or does not hold a
+        player and a floor.
     """
 
     with open(filename, 'r') as save_file:
-        return cPickle.load(save_file)
+        try:
+            save_data = cPickle.load(save_file)
+        except (cPickle.UnpicklingError, EOFError), e:
+            raise exc.SaveFormatError("%s is not a save file: %s"
+                                      % (filename, e))
+
+    if not (isinstance(save_data, tuple) and len(save_data) == 2
+            and isinstance(save_data[0], dude.Dude)
+            and save_data[0].isPlayer()
+            and isinstance(save_data[1], int)):
+        raise exc.SaveFormatError("%s does not hold a player and a floor."
+                                  % filename)
+    return save_data
 
 def getFile(filename):
     """
@@ -183,20 +201,20 @@ def constructDungeon(linelist):
         for i in range(dimensions[0]):
             cur_char = linelist[j][i]
             if cur_char == '.':
-                final_glyph = level.ROOM_INTERIOR_GLYPH
+                final_tile = level.ROOM_INTERIOR_TILE
             elif cur_char == '#':
-                final_glyph = level.CORRIDOR_GLYPH
+                final_tile = level.CORRIDOR_TILE
             elif cur_char == '<':
-                final_glyph = level.UPSTAIRS_GLYPH
+                final_tile = level.UPSTAIRS_TILE
             elif cur_char == '>':
-                final_glyph = level.DOWNSTAIRS_GLYPH
+                final_tile = level.DOWNSTAIRS_TILE
             elif cur_char == ' ':
-                final_glyph = config.TRANSPARENT_GLYPH
+                final_tile = symbol.TRANSPARENT_TILE
             else:
                 log.pasAss(True, "Invalid character loaded for dungeon: %s"
                     % cur_char)
 
-            ret_dungeon[i, j] = final_glyph
+            ret_dungeon[i, j] = final_tile
 
     return ret_dungeon
 
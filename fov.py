@@ -1,9 +1,195 @@
+import os
+
+import numpy
+
 import coordinates
+import metrics
 from level import OPEN_GLYPHS
-import libtcodpy as tcod
 
 FOV_RADIUS = 4
 
+# The transformations from the octant cast by _cast_light() to each of the
+# eight octants around the viewpoint, as (xx, xy, yx, yy).
+OCTANTS = ((1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+           (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1))
+
+class FOVBackend(object):
+    """
+    A way of calculating which squares of a level can be seen from a square.
+
+    Walls are visible, but cannot be seen through.  Backends must agree on
+    which squares are visible, so that the game plays the same whichever one
+    is used.
+    """
+
+    def visibleMask(self, level_, viewpoint, radius):
+        """
+        Return a boolean array with the level's dimensions, True at the
+        squares visible from viewpoint.
+
+        level_ - the level being looked at.
+        viewpoint - the coordinates of the square being looked from.
+        radius - the greatest distance at which a square can be seen.
+        """
+
+        raise NotImplementedError("Only implemented by FOVBackend's children.")
+
+    def visibleMasks(self, level_, viewpoints, radius):
+        """
+        Return a boolean array of shape (len(viewpoints),) + the level's
+        dimensions, element i of which is the visibleMask() of viewpoints[i].
+        """
+
+        masks = numpy.zeros((len(viewpoints),) + level_.dimensions, bool)
+        for i in range(len(viewpoints)):
+            masks[i] = self.visibleMask(level_, viewpoints[i], radius)
+        return masks
+
+class TCODBackend(FOVBackend):
+    """
+    Calculates fields of view with libtcod's shadowcasting, on the level's
+    sight map.
+    """
+
+    def visibleMask(self, level_, viewpoint, radius):
+        import libtcodpy as tcod
+
+        sight_map = level_.getSightMap()
+        tcod.map_compute_fov(sight_map, viewpoint[0], viewpoint[1], radius,
+            True, tcod.FOV_SHADOW)
+
+        mask = numpy.zeros(level_.dimensions, bool)
+# map_is_in_fov() does not check its arguments, so only ask about squares
+# which are actually on the level.
+        for i in range(max(viewpoint[0] - radius, 0),
+                       min(viewpoint[0] + radius + 1, level_.dimensions[0])):
+            for j in range(max(viewpoint[1] - radius, 0),
+                           min(viewpoint[1] + radius + 1, level_.dimensions[1])):
+                if tcod.map_is_in_fov(sight_map, i, j):
+                    mask[i, j] = True
+
+        return mask
+
+class ShadowcastingBackend(FOVBackend):
+    """
+    Calculates fields of view with recursive shadowcasting in Python, on the
+    level's transparency array.  It needs nothing from libtcod, and gives
+    exactly the same fields of view as TCODBackend.
+    """
+
+    def visibleMask(self, level_, viewpoint, radius):
+        return self.visibleMasks(level_, [viewpoint], radius)[0]
+
+    def visibleMasks(self, level_, viewpoints, radius):
+        transparent = level_.transparent.tolist()
+        masks = numpy.zeros((len(viewpoints),) + level_.dimensions, bool)
+        for i in range(len(viewpoints)):
+            visible = []
+            for octant in OCTANTS:
+                _cast_light(transparent, visible, viewpoints[i], 1, 1.0, 0.0,
+                            radius, octant)
+            visible.append(viewpoints[i])
+            masks[i][tuple(numpy.transpose(visible))] = True
+        return masks
+
+# The backends, by the names they can be chosen with.
+BACKENDS = {
+    "tcod" : TCODBackend,
+    "shadowcasting" : ShadowcastingBackend,
+}
+
+# The environment variable naming the backend to use, if it is set.
+BACKEND_VARIABLE = "SPIRIT_FOV"
+
+def use_backend(name):
+    """
+    Calculate every fov from now on with the backend of the name given, a key
+    of BACKENDS.
+    """
+
+    global backend
+
+    if name not in BACKENDS:
+        raise ValueError("There is no fov backend named %s." % name)
+    backend = BACKENDS[name]()
+
+# The backend used to calculate every fov.
+backend = None
+use_backend(os.environ.get(BACKEND_VARIABLE, "tcod"))
+
+def _single(number):
+    """
+    Round a float to single precision, as libtcod stores its slopes.
+    """
+
+    return float(numpy.float32(number))
+
+def _cast_light(transparent, visible, viewpoint, row, start, end, radius,
+                octant):
+    """
+    Add the visible squares of one octant around viewpoint to a list, from
+    row onward, between the slopes start and end.
+
+    This follows TCOD_map_compute_fov_recursive_shadowcasting() in libtcod
+    1.5.0 step for step, down to its rounding, so that the two agree on every
+    square.
+
+    transparent - nested lists, transparent[x][y] being True if the square
+        (x, y) can be seen through.
+    visible - the list to which visible squares are added.  A square may be
+        added more than once.
+    viewpoint - the square being looked from.
+    row - the first row of the octant to be scanned.
+    start - the slope at which the scan of each row starts.
+    end - the slope at which the scan of each row ends.
+    radius - the greatest distance at which a square can be seen.
+    octant - the transformation into the octant, one of OCTANTS.
+    """
+
+    if start < end:
+        return
+
+    (xx, xy, yx, yy) = octant
+    (cx, cy) = viewpoint
+    (width, height) = (len(transparent), len(transparent[0]))
+    radius_squared = radius * radius
+    new_start = 0.0
+
+    for j in range(row, radius + 1):
+        dy = -j
+        blocked = False
+        for dx in range(-j, 1):
+            x = cx + dx * xx + dy * xy
+            y = cy + dx * yx + dy * yy
+            if not (0 <= x < width and 0 <= y < height):
+                continue
+
+            left_slope = (dx - 0.5) / (dy + 0.5)
+            right_slope = (dx + 0.5) / (dy - 0.5)
+            if start < right_slope:
+                continue
+            elif end > left_slope:
+                break
+
+            if dx * dx + dy * dy <= radius_squared:
+                visible.append((x, y))
+
+            if blocked:
+                if not transparent[x][y]:
+                    new_start = _single(right_slope)
+                    continue
+                else:
+                    blocked = False
+                    start = new_start
+            elif not transparent[x][y] and j < radius:
+                blocked = True
+                _cast_light(transparent, visible, viewpoint, j + 1, start,
+                            _single(left_slope), radius, octant)
+                new_start = _single(right_slope)
+
+        if blocked:
+            break
+
 class fov(object):
     """
     An object representing a dude's field of view.  Contains two pieces of
@@ -17,9 +203,17 @@ class fov(object):
 
 # Private state:
 # __the_field: a set containing the coordinates visible.
+# __points: a pair of integer arrays (xs, ys) of the same coordinates, for
+#     indexing arrays with.
+# __stamp: a tuple (viewpoint, terrain version) recording where, and on which
+#     version of which level's terrain (see Level.terrain_version), the field
+#     was calculated; or None if it must be calculated afresh.
 
     def __init__(self):
         self.__the_field = set()
+        self.__points = (numpy.zeros(0, int), numpy.zeros(0, int))
+        self.__stamp = None
+        self.dudes = frozenset()
 
     def __contains__(self, key):
         """
@@ -38,44 +232,83 @@ class fov(object):
     def __iter__(self):
         return self.__the_field.__iter__()
 
+    def __setstate__(self, state):
+        """
+        Fill in the fields which fovs pickled by older versions lack; their
+        squares are kept, but are calculated afresh when next asked for.
+        """
+
+        self.__dict__.update(state)
+        if "_fov__points" not in state:
+            self.__the_field = state.get("_fov__the_field", set())
+            self.__points = (numpy.array([x for (x, y) in self.__the_field],
+                                         int),
+                             numpy.array([y for (x, y) in self.__the_field],
+                                         int))
+            self.__stamp = None
+        if "dudes" not in state:
+            self.dudes = frozenset()
+
     def recalculate(self, level_, initial_location):
         """
         Set this fov to the squares seen from initial_location on level_.
 
+        The squares seen are only calculated again if the viewpoint or the
+        level's terrain has changed since they were last calculated; the dudes
+        seen are always brought up to date.
+
         level_ - The level on which the field of view is being calculated.
         initial_location - the viewpoint from which the field of view is being
             calculated.
+
+        Returns: True if the squares seen were calculated again, False if the
+            ones already held were reused.
         """
         
-        dimensions = level_.dimensions
-        map = level_.sight_map
+        stamp = (initial_location, level_.terrain_version)
+        recalculated = stamp != self.__stamp
+        measuring = metrics.enabled
+        if recalculated:
+            if measuring:
+                start = metrics.clock()
+            mask = backend.visibleMask(level_, initial_location, FOV_RADIUS)
+            if measuring:
+                metrics.stats.time("fov.recompute", metrics.clock() - start)
+            self.__points = numpy.nonzero(mask)
+            self.__the_field = set(zip(self.__points[0].tolist(),
+                                       self.__points[1].tolist()))
+            self.__stamp = stamp
+        elif measuring:
+            metrics.stats.count("fov.cache_hits")
 
-        tcod.map_compute_fov(map, initial_location[0], 
-            initial_location[1], FOV_RADIUS, True, tcod.FOV_SHADOW)
+        self.dudes = frozenset(d for d in
+            level_.dudeLayer.index.inRadius(initial_location, FOV_RADIUS)
+            if d.coords in self.__the_field and d.coords != initial_location)
+        return recalculated
 
-        border = set()
-        fov_set = set()
-        dude_set = set()
-
-        for i in range(initial_location[0] - FOV_RADIUS, 
-            initial_location[0] + FOV_RADIUS + 1):
-
-            for j in range(initial_location[1] - FOV_RADIUS,
-                initial_location[1] + FOV_RADIUS + 1):
-                    
-                    if tcod.map_is_in_fov(map, i, j):
-                        fov_set.add((i, j))
-                        if (i, j) != initial_location and (i, j) in level_.dudeLayer:
-                            dude_set.add(level_.dudeLayer[(i, j)])
+    def invalidate(self):
+        """
+        Make the next call to recalculate() calculate the squares seen afresh.
+        """
 
-        self.__the_field = fov_set
-        self.dudes = frozenset(dude_set)
+        self.__stamp = None
 
     def updateMemory(self, memory):
         """
-        Add the coordinates in the FOV to a given set.
+        Mark the coordinates in the FOV as remembered.
 
-        memory - the set for the coordinates to be added to.
+        memory - a boolean array covering the level, in which the coordinates
+            are to be set to True.
+        """
+
+        memory[self.__points] = True
+
+    def getMask(self, dimensions):
+        """
+        Return a boolean array of the dimensions given, True at the coordinates
+        in the FOV and False elsewhere.
         """
 
-        memory.update(self.__the_field)
+        mask = numpy.zeros(dimensions, bool)
+        mask[self.__points] = True
+        return mask
@@ -48,7 +48,8 @@ class kp:
     ESCAPE,
     FIRE,
     HEAL,
-    ) = range(33)
+    PROFILE,
+    ) = range(34)
 
 mainScreenTranslationTable = {
 ord('k') : kp.N,
@@ -75,6 +76,7 @@ ord('<') : kp.UP,
 ord('f') : kp.FIRE,
 ord('v') : kp.FIRE,
 ord('r') : kp.HEAL,
+ord('P') : kp.PROFILE,
 ord('1') : kp.CARD_1,
 ord('2') : kp.CARD_2,
 ord('3') : kp.CARD_3,
@@ -121,6 +123,7 @@ tTables = {
 "boolean" : booleanQuestionTranslationTable,
 "direction" : directionTranslationTable,
 "card" : cardTranslationTable,
+"pause" : {},
 }
 
 # "Card switch"--maps card invocation keys to numbers, from 0 to 6.
@@ -146,6 +149,7 @@ DIRECTION_SWITCH =  {
                     kp.ESCAPE: None,
                     }
 
+import exc
 import tcod_display as display
 
 def isCard(key):
@@ -155,15 +159,107 @@ def isCard(key):
 
     return key in card_values
 
+class InputSource(object):
+    """
+    Something which answers requests for keypresses: a keyboard, a script, or
+    a bot.
+
+    Fields:
+    raw - True if nextKey() returns key codes, which are translated through
+        the key table for the mode; False if it returns kp codes, which are
+        used as they are.
+    """
+
+    raw = True
+
+    def nextKey(self, mode):
+        """
+        Return the next key, as a key code or a kp code according to raw.
+
+        mode - the name of the key table that will be used to interpret the
+            key.  "pause" means that any key will do.
+        """
+
+        raise NotImplementedError(
+            "Only implemented by InputSource's children.")
+
+    def getKey(self, mode):
+        """
+        Return the next key as a kp code, kp.NOTKEY if it means nothing in this
+        mode.
+        """
+
+        key = self.nextKey(mode)
+        if not self.raw:
+            return key
+
+        usedTranslationTable = tTables[mode]
+        if key in usedTranslationTable:
+            return usedTranslationTable[key]
+        else:
+            return kp.NOTKEY
+
+class KeyboardInput(InputSource):
+    """
+    Waits for the player to press a key.
+    """
+
+    def nextKey(self, mode):
+        return display.wait_for_key()
+
+class ScriptedInput(InputSource):
+    """
+    Answers with keys from a list, in order.
+
+    Raises exc.InputExhausted when a key is asked for after the list runs out.
+    """
+
+    def __init__(self, keys, raw = True):
+        """
+        keys - an iterable of keys.  If raw is True, each key is a key code or
+            a one-character string; otherwise each is a kp code.
+        raw - as the field of the same name.
+        """
+
+        self.raw = raw
+        self.__keys = iter(keys)
+
+    def nextKey(self, mode):
+        try:
+            key = self.__keys.next()
+        except StopIteration:
+            raise exc.InputExhausted("The scripted keys have run out.")
+
+        if isinstance(key, str):
+            return ord(key)
+        else:
+            return key
+
+class CallbackInput(InputSource):
+    """
+    Answers with the keys returned by a function, such as a bot's.
+    """
+
+    def __init__(self, callback, raw = False):
+        """
+        callback - a function of one argument, the mode, which returns the next
+            key.  It may raise exc.InputExhausted to stop the game.
+        raw - as the field of the same name.
+        """
+
+        self.raw = raw
+        self.callback = callback
+
+    def nextKey(self, mode):
+        return self.callback(mode)
+
+# The source of keypresses.  Replace it to run the game unattended.
+source = KeyboardInput()
+
 def getKey(mode = "main"):
     """Get a keypress.  "mode" is a string indicating the used key table."""
     
-    key = display.wait_for_key()
-    usedTranslationTable = tTables[mode]
-    if key in usedTranslationTable:
-        return usedTranslationTable[key]
-    else:
-        return kp.NOTKEY
+    return source.getKey(mode)
 
 def question(messages, prompt, mode = "main"):
     """
@@ -260,5 +356,5 @@ def pause(messages):
     Ask for a keypress, not caring what it is.
     """
 
-    question(messages, "--MORE--")
+    question(messages, "--MORE--", "pause")
     messages.archive()
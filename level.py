@@ -2,20 +2,24 @@
 level.py includes the Level class, which stores a specific dungeon level.
 """
 
+import collections
+
 import config
 import arrays
 import coordinates
 import log
+import metrics
 import msg
 import symbol
 import events
 import effects
 import queue
+import pf
+import spatial
 import dude
 import rng
 
 import numpy
-import libtcodpy as tcod
 
 ROOM_INTERIOR_GLYPH = symbol.Glyph('.', (255, 255, 255))
 CORRIDOR_GLYPH = symbol.Glyph('#', (118, 41, 0))
@@ -25,6 +29,32 @@ DOWNSTAIRS_GLYPH = symbol.Glyph('>', (0, 255, 0))
 OPEN_GLYPHS = set([ROOM_INTERIOR_GLYPH, CORRIDOR_GLYPH])
 PASSABLE_TERRAIN = set([ROOM_INTERIOR_GLYPH, CORRIDOR_GLYPH])
 
+ROOM_INTERIOR_TILE = symbol.tile(ROOM_INTERIOR_GLYPH)
+CORRIDOR_TILE = symbol.tile(CORRIDOR_GLYPH)
+UPSTAIRS_TILE = symbol.tile(UPSTAIRS_GLYPH)
+DOWNSTAIRS_TILE = symbol.tile(DOWNSTAIRS_GLYPH)
+
+OPEN_TILES = set([symbol.tile(g) for g in OPEN_GLYPHS])
+PASSABLE_TILES = set([symbol.tile(g) for g in PASSABLE_TERRAIN])
+
+# Dormant monsters further than WAKE_RADIUS squares from the player are put to
+# sleep, and are woken when the player comes within WAKE_RADIUS of them, or a
+# noise is made within NOISE_RADIUS.  WAKE_RADIUS is more than the radius of a
+# field of view, so no sleeping monster can see the player.
+WAKE_RADIUS = 6
+NOISE_RADIUS = 6
+
+# DIRECTION_BITS[direction] is the bit of a move mask (see Level.move_masks)
+# which is set if a move in that direction is legal.
+DIRECTION_BITS = dict((coordinates.DIRECTIONS[i], 1 << i)
+                      for i in range(len(coordinates.DIRECTIONS)))
+
+# MOVES_BY_MASK[mask] is a tuple of the directions whose bits are set in the
+# move mask "mask", in the order of coordinates.DIRECTIONS.
+MOVES_BY_MASK = tuple(tuple(d for d in coordinates.DIRECTIONS
+                            if mask & DIRECTION_BITS[d])
+                      for mask in range(1 << len(coordinates.DIRECTIONS)))
+
 class Level(object):
     """
     A Level is an object that represents the current state of a dungeon level.
@@ -34,13 +64,33 @@ class Level(object):
     Fields:
     effects - an effectsMap containing the effects to be laid over the level.
     dudeLayer - the Layer containing Dudes and, of course, the player.
-    elements - an array of characters containing terrain features which
-        exist on top of ordinary terrain, like stairs.
-    dungeon - an array of characters representing walls and floors.
+    events - a list of the Events on the Level.
+    event_index - a spatial.GridIndex of those Events which have a coords
+        field, that is, which happen at a particular square.
+    elements - a glyphMap containing terrain features which exist on top of
+        ordinary terrain, like stairs.
+    dungeon - an array of tiles representing walls and floors.  If it is
+        changed after the Level is created, it must be changed through
+        setTerrain().
+    terrain_version - an ID which changes whenever the dungeon does, and
+        which no other Level's terrain_version ever matches.
+    passable - a boolean array, True wherever the dungeon is passable.
+    transparent - a boolean array, True wherever the dungeon can be seen
+        through.
+    move_masks - an array of 8-bit move masks, one per square.  Bit i of
+        move_masks[coords] is set if a move from coords in direction
+        coordinates.DIRECTIONS[i] is legal given the dungeon layout.
+    current_actor - the dude or event taking the turn next() is running, or
+        the last one to take a turn; None before the first turn.
+    rng - the rng.Streams the Level is played with: monsters choose their
+        actions with rng.ai, and attacks and healing are decided with
+        rng.combat.
     """
     """
-    __composite_map - an array of strings, representing a top-down view of
+    __composite_map - an array of tiles, representing a top-down view of
         the Level, with the Dudes on top and the dungeon on the bottom.
+    __sight_map - a TCOD map of the terrain, used by fov.TCODBackend, or None
+        if it has not been made (see getSightMap()).
     __height_map - an array of integers, representing the height of each
         tile of the __composite_map, that is, which part of the Level each
         tile came from.
@@ -48,6 +98,15 @@ class Level(object):
         __height_map are correct, and don't need to be refreshed.  If
         False, then they are incorrect, and refresh_maps() must be called
         before they are used.
+    __player_distances - a distance map (see pf.distance_map()) to the
+        player's square, or None if none has been made yet.
+    __player_distances_source - the player's square when __player_distances
+        was made.
+    __sleepers - a dict whose keys are the actors which are asleep, taken off
+        the queue by next(), and whose values are pairs (the time at which the
+        actor would next have acted, the ticks between its actions).
+    __wake_coords - the player's square when next() last woke the sleepers
+        near the player.
     __SOLID_EFFECTS_HEIGHT - the height of solid effects.
     __DUDE_HEIGHT - the height of dudes.
     __ELEMENT_HEIGHT - the height of elements.
@@ -60,7 +119,8 @@ class Level(object):
     __DUNGEON_HEIGHT = 8
     
     def __init__(self, 
-        dimensions, floor, dude_layer, elements, dungeon, definition):
+        dimensions, floor, dude_layer, elements, dungeon, definition,
+        streams = None):
         """
         Create a Level.
 
@@ -68,12 +128,14 @@ class Level(object):
         floor - the height of the Level in comparison to other Levels;
             an integer.
         dude_layer - a DudeLayer.  (If None, a DudeLayer will be created.)
-        elements - an array representing the elements of the Level: terrain
+        elements - a glyphMap representing the elements of the Level: terrain
             features which are overlaid upon the regular terrain, but which
             cannot be picked up like items.
-        dungeon - an array representing the dungeon: the walls, floors, and
-            other terrain.
+        dungeon - an array of tiles representing the dungeon: the walls,
+            floors, and other terrain.
         definition - a FloorDefinition for this Level.
+        streams - the rng.Streams the Level is played with.  (If None, the
+            global random module is used.)
         """
 
         if dude_layer is None:
@@ -86,26 +148,66 @@ class Level(object):
         self.dudeLayer = dude_layer
         self.effects = effects.EffectsMap(dimensions)
         self.definition = definition
+        self.rng = rng.DEFAULT_STREAMS if streams is None else streams
         self.player = None
         self.messages = msg.MessageBuffer(config.MESSAGES_DIMENSIONS)
         self.__composite_map = arrays.empty_str_array(dimensions)
         self.__height_map = numpy.zeros(dimensions, 'i')
         self.__are_maps_correct = False
         self.__queue = None
+        self.__player_distances = None
+        self.__player_distances_source = None
+        self.__sleepers = {}
+        self.__wake_coords = None
         self.events = [events.LevelTick(self)]
+        self.event_index = spatial.GridIndex(dimensions)
         self.time = 0
+        self.current_actor = None
 
-        self.sight_map = make_sight_map(dungeon)
+        self.passable = passable_mask(dungeon)
+        self.move_masks = make_move_masks(self.passable)
+        self.transparent = transparent_mask(dungeon)
+        self.terrain_version = config.getID()
+        self.__sight_map = None
     
     def __str__(self):
         return str(self.getArray())
 
-    def __del__(self):
+    def __getstate__(self):
+        """
+        The sight map lives in libtcod, and cannot be pickled; it is made
+        again when the unpickled Level first needs it.
+        """
+
+        state = self.__dict__.copy()
+        state["_Level__sight_map"] = None
+        return state
+
+    def close(self):
+        """
+        Free the sight map, which is held by libtcod and so is not freed when
+        the Level is garbage-collected.  Call this once the Level is no longer
+        being played.
+
+        The Level can still be used afterward; the sight map is simply made
+        again if it is needed.
+        """
+
+        if self.__sight_map is not None:
+            import libtcodpy as tcod
+
+            tcod.map_delete(self.__sight_map)
+            self.__sight_map = None
+
+    def getSightMap(self):
         """
-        The sight map must be manually garbage-collected.
+        Return a TCOD map of the Level's terrain, for use with libtcod's field
+        of view functions, making it if it has not yet been made.
         """
 
-        tcod.map_delete(self.sight_map)
+        if self.__sight_map is None:
+            self.__sight_map = make_sight_map(self.transparent)
+        return self.__sight_map
 
     def __addCharacterToMap(self, glyph, coords, height):
         """
@@ -120,7 +222,7 @@ class Level(object):
 
 # Remember that small height means being near the top.
         if height <= self.__height_map[coords]:
-            self.__composite_map[coords] = glyph
+            self.__composite_map[coords] = symbol.tile(glyph)
             self.__height_map[coords] = height
 
         return
@@ -136,8 +238,9 @@ class Level(object):
         assert height >= self.__height_map[coords]
 
         if height == self.__height_map[coords]:
-            (self.__composite_map[coords], self.__height_map[coords]) = \
+            (glyph, self.__height_map[coords]) = \
                 self.__getCharacterBelow(coords, height)
+            self.__composite_map[coords] = symbol.tile(glyph)
 
         return
 
@@ -152,8 +255,8 @@ class Level(object):
         height - an integer representing the (exclusive) lower limit
             of height for the glyph being looked for.
         
-        Returns - a pair, containing a 1-character string (the glyph
-            found) and an integer (its height).
+        Returns - a pair, containing a glyph (the glyph found) and an integer
+            (its height).
         """
         
         if height < self.__SOLID_EFFECTS_HEIGHT:
@@ -179,7 +282,7 @@ class Level(object):
         """
         Get an array representing a top-down view of the Level.
 
-        Returns: An array of characters.
+        Returns: An array of tiles.
         """
 
         if not self.__are_maps_correct:
@@ -193,11 +296,12 @@ class Level(object):
         view - a fov containing the squares you want to be visible in the array.
                If view is None, the player's FOV is used.
         
-        Returns: an array of characters.
+        Returns: an array of tiles.
         """
         
         view = view if view != None else self.getPlayer().fov
-        return arrays.fovize(self.getArray(), view, self.dungeon, self.getPlayer().memory, symbol.REMEMBERED_COLOR)
+        return arrays.fovize(self.getArray(), view.getMask(self.dimensions),
+            self.dungeon, self.getPlayer().memory, symbol.REMEMBERED_COLOR)
 
     def dudeGlyph(self, coords):
         """
@@ -221,16 +325,28 @@ class Level(object):
         Get the symbol representing the spot on the dungeon array at coords.
         """
 
-        return self.dungeon[coords]
+        return symbol.glyph(self.dungeon[coords])
 
     def refreshMaps(self):
-        maps = arrays.overlay((self.dudeLayer.getArray(), self.elements, 
-            self.dungeon), (self.__DUDE_HEIGHT, self.__ELEMENT_HEIGHT,
-            self.__DUNGEON_HEIGHT))
+        """
+        Rebuild the composite and height maps from every part of the Level.
+        """
+
+        measuring = metrics.enabled
+        if measuring:
+            start = metrics.clock()
+
+        maps = arrays.overlay((self.effects.getArray(),
+            self.dudeLayer.getArray(), self.elements.getArray(),
+            self.dungeon), (self.__SOLID_EFFECTS_HEIGHT, self.__DUDE_HEIGHT,
+            self.__ELEMENT_HEIGHT, self.__DUNGEON_HEIGHT))
         self.__composite_map = maps[0]
         self.__height_map = maps[1]
         self.__are_maps_correct = True
 
+        if measuring:
+            metrics.stats.time("level.refresh_maps", metrics.clock() - start)
+
         return
     
     def addDude(self, addedDude, coords = None, addToQueue = True):
@@ -310,12 +426,17 @@ class Level(object):
 # If it's an event, remove it.
         if target in self.events:
             self.events.remove(target)
+            if getattr(target, "coords", None) is not None:
+                self.event_index.remove(target)
             something_was_killed = True
         
 # If it's in the queue, remove it from there.
         if target in self.__queue:
             self.__queue.erase(target)
             something_was_killed = True
+        if self.isAsleep(target):
+            del self.__sleepers[target]
+            something_was_killed = True
 
         if not something_was_killed:
             raise ValueError("Couldn't kill %s." % target)
@@ -325,7 +446,7 @@ class Level(object):
         Gets the particular glyph of a dungeon square.
         """
         
-        return self.dungeon[coords]
+        return symbol.glyph(self.dungeon[coords])
 
     def addSolidEffect(self, coords, glyph):
         """
@@ -364,23 +485,15 @@ class Level(object):
         This function does not take into account monsters on either square.
         """
 
-               # the given coordinates are legal
-        result = (all(map(self.legalCoordinates, (coords1, coords2))) and
-               # the movedDude can move on the dungeon tile of moveCoords
-                all(map(self.isEmpty, (coords1, coords2))) and
-               # moveCoords is only one square away
-                (coordinates.minimumPath(coords1, coords2) == 1))
+        if not self.legalCoordinates(coords1):
+            return False
 
-        # a "corner move," of the following form, is NOT being performed
-        # d.      (moving from s to d)
-        # #s
+        direction_bit = DIRECTION_BITS.get(
+            (coords2[0] - coords1[0], coords2[1] - coords1[1]))
+        if direction_bit is None:
+            return False
 
-        if coordinates.are_diagonally_adjacent(coords1, coords2):
-            adjacent_squares = ((coords1[0], coords2[1]), (coords2[0], coords1[1]))
-# Return true only if both adjacent squares are empty, i.e. disallow corner moves.
-            result = result and all(map(lambda x: self.isEmpty(x), adjacent_squares))
-        
-        return result
+        return bool(self.move_masks[coords1] & direction_bit)
 
     def canMove(self, movedDude, moveCoords):
         """
@@ -397,7 +510,7 @@ class Level(object):
         """
         Returns true if a square contains an "empty" glyph.
         """
-        return self.dungeonGlyph(coords) in PASSABLE_TERRAIN
+        return self.dungeon[coords] in PASSABLE_TILES
 
     def immediately_accessible_squares(self, coords):
         """
@@ -407,8 +520,63 @@ class Level(object):
         or destination squares.
         """
 
-        adjacent_coords = coordinates.adjacent_coords(coords)
-        return [x for x in adjacent_coords if self.are_immediately_accessible(coords, x)]
+        if not self.legalCoordinates(coords):
+            return []
+
+        return [(coords[0] + d[0], coords[1] + d[1])
+                for d in MOVES_BY_MASK[self.move_masks[coords]]]
+
+    def playerDistances(self):
+        """
+        Return a distance map (see pf.distance_map()) giving the number of
+        moves from each square to the player.
+
+        The map is shared by every monster on the Level, and is only made
+        again once the player or the dungeon has changed.
+        """
+
+        if (self.__player_distances is None
+            or self.__player_distances_source != self.player.coords):
+
+            self.__player_distances = pf.distance_map(self, self.player.coords)
+            self.__player_distances_source = self.player.coords
+
+        return self.__player_distances
+
+    def setTerrain(self, coords, tile):
+        """
+        Change the dungeon tile at coords, and update everything derived from
+        the dungeon to match.
+
+        coords - the coordinates of the square being changed.
+        tile - the new tile of the square.
+        """
+
+        self.dungeon[coords] = tile
+        self.passable[coords] = tile in PASSABLE_TILES
+        self.transparent[coords] = tile in OPEN_TILES
+        self.terrain_version = config.getID()
+
+# Only moves from the square and its neighbors can pass through or cut the
+# corner of the square.
+        nw_corner = (max(coords[0] - 1, 0), max(coords[1] - 1, 0))
+        se_corner = (min(coords[0] + 1, self.dimensions[0] - 1),
+                     min(coords[1] + 1, self.dimensions[1] - 1))
+        update_move_masks(self.move_masks, self.passable,
+                          nw_corner, se_corner)
+        self.__player_distances = None
+
+        if self.__sight_map is not None:
+            import libtcodpy as tcod
+
+            tcod.map_set_properties(self.__sight_map, coords[0], coords[1],
+                                    tile in OPEN_TILES, False)
+
+        if self.__are_maps_correct:
+            (glyph, height) = self.__getCharacterBelow(coords,
+                self.__SOLID_EFFECTS_HEIGHT - 1)
+            self.__composite_map[coords] = symbol.tile(glyph)
+            self.__height_map[coords] = height
 
     def legalCoordinates(self, coords):
         """
@@ -451,6 +619,18 @@ class Level(object):
         new_mon = self.definition.monster_factory.create(mon_name)
         self.addDude(new_mon, coords, True)
 
+    def playerCanSee(self, coords):
+        """
+        Return True if the square at coords is in the player's field of view.
+
+        The player's fov is only calculated again if the player or the terrain
+        has changed since it was last calculated, so asking this for many
+        squares on the same turn is cheap.
+        """
+
+        self.getPlayer().resetFOV()
+        return coords in self.getPlayer().fov
+
     def makeNoise(self, message, center):
         """
         Add a message to the queue provided a certain square is in player FOV.
@@ -459,9 +639,9 @@ class Level(object):
         center - the square which must be in FOV for the message to be displayed.
         """
         
-        self.getPlayer().resetFOV()
-        if center in self.getPlayer().fov:
+        if self.playerCanSee(center):
             self.messages.append(message)
+        self.wakeNear(center, NOISE_RADIUS)
 
         return
     
@@ -492,12 +672,52 @@ class Level(object):
                 q.put(p, 0)
 
         self.__queue = q
+        self.__sleepers = {}
+        self.__wake_coords = None
+
+    def isAsleep(self, actor):
+        """
+        Return True if actor is asleep, that is, off the queue until woken.
+        """
+
+        return actor in self.__sleepers
+
+    def wake(self, actor):
+        """
+        Put actor back on the queue if it is asleep; otherwise, do nothing.
+
+        The actor acts at the first time not yet past at which it would have
+        acted had it been waiting all along, so that it keeps its place in
+        the order of turns.
+        """
+
+        if not self.isAsleep(actor):
+            return
+
+        (next_time, interval) = self.__sleepers.pop(actor)
+        if next_time < self.time:
+            missed_actions = (self.time - next_time + interval - 1) // interval
+            next_time += missed_actions * interval
+        self.__queue.put(actor, next_time)
+
+    def wakeNear(self, center, radius):
+        """
+        Wake every sleeping actor at most radius squares from center.
+        """
+
+        if not self.__sleepers:
+            return
+
+        for dude_ in self.dudeLayer.index.inRadius(center, radius):
+            self.wake(dude_)
 
     def addEvent(self, event, execution_time):
         """
         Add an event to the level.
         """
         self.events.append(event)
+        if getattr(event, "coords", None) is not None:
+            self.event_index.add(event)
         if self.__queue is not None:
             self.__queue.put(event, self.time + execution_time)
 
@@ -508,25 +728,52 @@ class Level(object):
         its turn without this method returning.
         """
         
+        measuring = metrics.enabled
+        if measuring:
+            start = metrics.clock()
+
         if (self.__queue is None) or (self.__queue.isEmpty()):
             self.resetQueue()
+        if self.__sleepers and self.player.coords != self.__wake_coords:
+            self.__wake_coords = self.player.coords
+            self.wakeNear(self.player.coords, WAKE_RADIUS)
         self.time += self.__queue.priority_interval()
         next_actor = self.__queue.get()
+        self.current_actor = next_actor
 
 # The act() method returns the speed of the action, the number of ticks until
 # the actor gets to move again.  (If the number of ticks is 0, things get weird,
 # so this method just asks for another action instead of going through the
 # queue.
         actor_ticks = 0
-        while actor_ticks == 0 and next_actor.exists():
-            actor_ticks = next_actor.act()
-
+        if measuring:
+            act_start = metrics.clock()
+        try:
+            while actor_ticks == 0 and next_actor.exists():
+                actor_ticks = next_actor.act()
+        finally:
+            if measuring:
+                metrics.stats.actorTook(next_actor,
+                                        metrics.clock() - act_start)
+
+# A dormant actor far from the player is put to sleep rather than back on the
+# queue, since all it would do is wait.
         if next_actor.exists():
-            self.__queue.put(next_actor, self.time + actor_ticks)
-
+            if next_actor.isDormant() and self.player is not None \
+                and coordinates.minimumPath(
+                next_actor.coords, self.player.coords) > WAKE_RADIUS:
+
+                self.__sleepers[next_actor] = (self.time + actor_ticks,
+                                               actor_ticks)
+            else:
+                self.__queue.put(next_actor, self.time + actor_ticks)
+
+        if measuring:
+            metrics.stats.time("level.next", metrics.clock() - start)
+            metrics.stats.maybeDump()
         return
 
-class Layer(list):
+class Layer(object):
     """
     A Layer is a collection of FixedObjects, all on the same level.
     
@@ -536,50 +783,57 @@ class Layer(list):
     
     Note that the dudes should not normally be directly added to the DudeLayer;
     they should be added through a Level instead.
+
+    Adding, removing, moving and finding an object all take constant time.
+    Iterating over a Layer yields its objects in the order they were added.
+
+    Fields:
+    dimensions - the dimensions of the Level the Layer belongs to.
+    coordinateDict - a dict whose keys are coordinates and whose values are
+        the objects at those coordinates.
+    index - a spatial.GridIndex of the objects, for finding those near a
+        square without looking at the rest.
     """
+
+# Private state:
+# __items - an OrderedDict whose keys are the IDs of the objects in this
+#     Layer and whose values are the objects themselves.
     
     def __init__(self, dimensions):
         """
         Supply a tuple for dimensions.
         """
         
-        #if initThing is None:
-        list.__init__(self)
-        #else:
-        #    dict.__init__(self, initThing)
-            
         self.dimensions = dimensions
         self.coordinateDict = {}
+        self.index = spatial.GridIndex(dimensions)
+        self.__items = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __iter__(self):
+# Iterate over a copy, so that objects can be removed during the iteration.
+        return iter(self.__items.values())
     
     def __getitem__(self, key):
-        """Works with dictionary key as well."""
-        try:
-            k = key[0]
-        except TypeError:
-            # key is not a sequence; assumed to be a list key
-            return list.__getitem__(self, key)
-        else:
-            # key is a sequence, assumed to be a coord key
-            return self.coordinateDict[key]
+        """Get the object at the coordinates given."""
+        return self.coordinateDict[key]
     
     def __delitem__(self, key):
-        """Deletes from dictionary as well."""
-        try:
-            k = key[0]
-        except TypeError:
-            # This will screw up silently if coords is wrong!
-            del self.coordinateDict[self[key].coords]
-            list.__delitem__(self, key)
-        else:
-            list.__delitem__(self, self.index(self[key]))
-            del self.coordinateDict[key]
+        """Delete the object at the coordinates given."""
+        self.remove(self.coordinateDict[key])
 
     def __contains__(self, item):
         """Returns true with an item in this Layer or coordinates of one."""
         try:
             item[0]
         except TypeError:
-            return list.__contains__(self, item)
+            try:
+                item_id = item.ID
+            except AttributeError:
+                return False
+            return self.__items.get(item_id) is item
         else:
             return item in self.coordinateDict
     
@@ -612,32 +866,60 @@ class Layer(list):
         if dudeOriginalCoords != moveCoords:
             self.__changeCoords(movedDude, moveCoords)
             movedDude.setCoords(moveCoords)
+            self.index.move(movedDude, dudeOriginalCoords)
 
     def getArray(self):
         array = arrays.empty_str_array(self.dimensions)
         for item in self:
-            array[item.coords] = item.getCurGlyph()
+            array[item.coords] = symbol.tile(item.getCurGlyph())
         return array
     
     def append(self, item):
         """Adds to dictionary as well."""
-        list.append(self, item)
+        self.__items[item.ID] = item
         self.__addCoords(item)
+        self.index.add(item)
         
     def extend(self, item):
         """Adds to dictionary as well."""
         for i in item:
             self.append(i)
 
+    def remove(self, item):
+        """
+        Remove an object from this layer.
+
+        Raises a ValueError if the object is not in this layer.
+        """
+
+        if item not in self:
+            raise ValueError("Layer.remove(x): x not in layer")
+        del self.__items[item.ID]
+        del self.coordinateDict[item.coords]
+        self.index.remove(item)
+
 class DudeLayer(Layer):
     """
     Just like a Layer, except that it has a nice, convenient queue.
+
+    Fields:
+    monster_count - the number of dudes in the layer which are not the player.
     """
     
     def __init__(self, player = None, *args, **kwds):
         Layer.__init__(self, *args, **kwds)
         self.moveQueue = []
         self.player = player
+        self.monster_count = 0
+
+    def append(self, item):
+        """
+        Add a dude to this layer.
+        """
+
+        Layer.append(self, item)
+        if not item.isPlayer():
+            self.monster_count += 1
     
     def remove(self, removed):
         """
@@ -645,8 +927,9 @@ class DudeLayer(Layer):
         """
         
         removed.setCurrentLevel(None)
-        # These lines is horribly inefficient; there's got to be a better way.
-        del self[self.index(removed)]
+        Layer.remove(self, removed)
+        if not removed.isPlayer():
+            self.monster_count -= 1
 
 class FloorDefinition(object):
     """
@@ -666,14 +949,15 @@ class FloorDefinition(object):
         self.monster_factory = monster_factory
         self.total = sum([i for i,j in self.rarities])
 
-    def getRandomMonster(self):
+    def getRandomMonster(self, stream = rng.DEFAULT):
         """
-        Return a random monster created on this floor.
+        Return a random monster created on this floor, chosen with the rng.RNG
+        stream.
         """
         if self.total == 0 or len(self.rarities) == 0:
             return self.monster_factory.getBuggyMonster()
 
-        random_number = rng.randInt(0, self.total - 1)
+        random_number = stream.randInt(0, self.total - 1)
         for r in self.rarities:
             random_number -= r[0]
             if random_number < 0:
@@ -693,18 +977,86 @@ def empty_elements(dimensions):
     
     return symbol.glyphMap(dimensions)
 
-def make_sight_map(dungeon):
+def passable_mask(dungeon):
     """
-    Returns a TCOD sight map of the dungeon given.
+    Return a boolean array which is True wherever the dungeon given is
+    passable terrain.
+    """
+
+    return numpy.in1d(dungeon, list(PASSABLE_TILES)).reshape(dungeon.shape)
 
-    dungeon - a dungeon array.
-    dimensions - the dime
+def transparent_mask(dungeon):
     """
-    
-    dimensions = dungeon.shape
-    smap = tcod.map_new(dimensions[0], dimensions[1])
-    for i in range(dimensions[0]):
-        for j in range(dimensions[1]):
-            tcod.map_set_properties(smap, i, j, dungeon[i, j] in OPEN_GLYPHS, False)
+    Return a boolean array which is True wherever the dungeon given can be
+    seen through.
+    """
+
+    return numpy.in1d(dungeon, list(OPEN_TILES)).reshape(dungeon.shape)
+
+def update_move_masks(move_masks, passable, nw_corner, se_corner):
+    """
+    Recalculate the move masks (see Level.move_masks) of the squares in a
+    rectangle.
+
+    A move is legal if both of its squares are passable and, if the move is
+    diagonal, both of the squares orthogonally adjacent to both of them are
+    passable too; that is, corners cannot be cut.
+
+    move_masks - the array of move masks to be updated.
+    passable - a boolean array, True wherever the terrain is passable.
+    nw_corner - the northwest corner of the rectangle to be recalculated.
+    se_corner - the southeast corner of the rectangle to be recalculated.
+        (Inclusive.)
+    """
+
+    (x0, y0) = nw_corner
+    (x1, y1) = (se_corner[0] + 1, se_corner[1] + 1)
+
+# Copy the rectangle and a one-square border around it out of the passable
+# array.  Any part of the border off the edge of the level is left impassable,
+# so that moves off the edge are never legal.
+    window = numpy.zeros((x1 - x0 + 2, y1 - y0 + 2), bool)
+    (src_x0, src_y0) = (max(x0 - 1, 0), max(y0 - 1, 0))
+    (src_x1, src_y1) = (min(x1 + 1, passable.shape[0]),
+                        min(y1 + 1, passable.shape[1]))
+    window[src_x0 - x0 + 1:src_x1 - x0 + 1, src_y0 - y0 + 1:src_y1 - y0 + 1] = \
+        passable[src_x0:src_x1, src_y0:src_y1]
+
+    def shifted(dx, dy):
+        return window[1 + dx:x1 - x0 + 1 + dx, 1 + dy:y1 - y0 + 1 + dy]
+
+    new_masks = numpy.zeros((x1 - x0, y1 - y0), numpy.uint8)
+    for (d, bit) in DIRECTION_BITS.items():
+        legal = shifted(0, 0) & shifted(d[0], d[1])
+        if d[0] != 0 and d[1] != 0:
+            legal &= shifted(d[0], 0) & shifted(0, d[1])
+        new_masks[legal] |= bit
+
+    move_masks[nw_corner[0]:se_corner[0] + 1,
+               nw_corner[1]:se_corner[1] + 1] = new_masks
+
+def make_move_masks(passable):
+    """
+    Return an array of the move masks (see Level.move_masks) of every square,
+    given a boolean array which is True wherever the terrain is passable.
+    """
+
+    move_masks = numpy.zeros(passable.shape, numpy.uint8)
+    update_move_masks(move_masks, passable, (0, 0),
+        (passable.shape[0] - 1, passable.shape[1] - 1))
+    return move_masks
+
+def make_sight_map(transparent):
+    """
+    Returns a TCOD sight map, in which the squares which are True in the
+    boolean array transparent can be seen through.
+
+    transparent - a boolean array, as in Level.transparent.
+    """
+
+    import libtcodpy as tcod
+
+    smap = tcod.map_new(transparent.shape[0], transparent.shape[1])
+    tcod.map_set_all_properties(smap, transparent, False)
 
     return smap
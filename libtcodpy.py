@@ -600,9 +600,9 @@ def console_fill_foreground(con,r,g,b) :
 	if (numpy_available and isinstance(r, numpy.ndarray) and
 		isinstance(g, numpy.ndarray) and isinstance(b, numpy.ndarray)):
 		#numpy arrays, use numpy's ctypes functions
-		r = numpy.ascontiguousarray(r, dtype=numpy.int_)
-		g = numpy.ascontiguousarray(g, dtype=numpy.int_)
-		b = numpy.ascontiguousarray(b, dtype=numpy.int_)
+		r = numpy.ascontiguousarray(r, dtype=numpy.intc)
+		g = numpy.ascontiguousarray(g, dtype=numpy.intc)
+		b = numpy.ascontiguousarray(b, dtype=numpy.intc)
 		cr = r.ctypes.data_as(ctypes.POINTER(ctypes.c_int))
 		cg = g.ctypes.data_as(ctypes.POINTER(ctypes.c_int))
 		cb = b.ctypes.data_as(ctypes.POINTER(ctypes.c_int))
@@ -625,9 +625,9 @@ def console_fill_background(con,r,g,b) :
 		isinstance(g, numpy.ndarray) and isinstance(b, numpy.ndarray)):
 		#numpy arrays, use numpy's ctypes functions
 		
-		r = numpy.ascontiguousarray(r, dtype=numpy.int_)
-		g = numpy.ascontiguousarray(g, dtype=numpy.int_)
-		b = numpy.ascontiguousarray(b, dtype=numpy.int_)
+		r = numpy.ascontiguousarray(r, dtype=numpy.intc)
+		g = numpy.ascontiguousarray(g, dtype=numpy.intc)
+		b = numpy.ascontiguousarray(b, dtype=numpy.intc)
 		cr = r.ctypes.data_as(ctypes.POINTER(ctypes.c_int))
 		cg = g.ctypes.data_as(ctypes.POINTER(ctypes.c_int))
 		cb = b.ctypes.data_as(ctypes.POINTER(ctypes.c_int))
@@ -1145,6 +1145,25 @@ def map_set_properties(m, x, y, isTrans, isWalk):
 def map_clear(m):
     _lib.TCOD_map_clear(m)
 
+# The layout of a TCOD map in memory.  Each cell is 4 bytes, the lowest bit of
+# which is set if the cell is transparent and the next if it is walkable.
+class _CMap(Structure):
+    _fields_=[('width', c_int),
+              ('height', c_int),
+              ('nbcells', c_int),
+              ('cells', c_void_p),
+              ]
+
+# set the properties of every cell at once, from NumPy arrays of booleans
+# indexed [x, y] (a single boolean applies to every cell)
+def map_set_all_properties(m, isTrans, isWalk):
+    cmap = cast(c_void_p(m), POINTER(_CMap)).contents
+    cells = numpy.zeros((cmap.height, cmap.width), numpy.uint32)
+    cells |= numpy.transpose(isTrans)
+    cells |= numpy.transpose(isWalk).astype(numpy.uint32) << 1
+    cells = numpy.ascontiguousarray(cells.astype('<u4'))
+    memmove(cmap.cells, cells.ctypes.data, cmap.nbcells * 4)
+
 def map_compute_fov(m, x, y, radius=0, light_walls=True, algo=FOV_RESTRICTIVE ):
     _lib.TCOD_map_compute_fov(m, x, y, c_int(radius), c_uint(light_walls), c_int(algo))
 
@@ -1,13 +1,19 @@
 """
 The main loop; if you want to play, this is where you do it.
-"""
 
-USE_PROFILER = False
+    python main.py [--profile[=MODE]]
 
-if USE_PROFILER:
-    import cProfile
+With --profile, the game is profiled.  MODE is "sample" (the default) to run
+the sampling profiler, which writes the stacks it saw, by floor, to
+sampler.COLLAPSED_PATH; or "cprofile" to time every call with cProfile, which
+is slower, and writes CPROFILE_PATH.  The environment variable SPIRIT_PROFILE
+may be set to a MODE instead.
+"""
 
+import cProfile
 import cPickle
+import os
+import sys
 
 import tcod_display as display
 import level
@@ -21,6 +27,7 @@ import mapgen
 import action
 import exc
 import kb
+import sampler
 
 import log
 
@@ -33,13 +40,17 @@ def main(win = None):
 
     try:
         save_data = fileio.restore_save("John Stenibeck.sav")
-    except IOError:
-# No save; load from a random dungeon instead.
+    except (IOError, exc.SaveFormatError), e:
+# No save, or one which cannot be read; load from a random dungeon instead.
         player = pc.Player("John Stenibeck", (40, 40))
         curlev = mapgen.nextLevel(floor_defs, 1, player)
+        if isinstance(e, exc.SaveFormatError):
+            curlev.messages.append(
+                "Your save could not be read, so a new game has begun.")
     else:
         (player, floor) = save_data
         curlev = mapgen.nextLevel(floor_defs, floor, player)
+    sampler.profiler.tag = "floor-%d" % curlev.floor
 
     display.init()
     display.display_main_screen(curlev.getFOVArray(),
@@ -54,7 +65,9 @@ def main(win = None):
             new_floor = curlev.floor + 1
             curlev.player.clearMemory()
             fileio.save_game(curlev.player, new_floor)
+            curlev.close()
             curlev = mapgen.nextLevel(floor_defs, new_floor, player)
+            sampler.profiler.tag = "floor-%d" % curlev.floor
             curlev.player.clearMemory()
             curlev.messages.append("Welcome to the next floor!")
             curlev.player.levelUp()
@@ -65,20 +78,59 @@ def main(win = None):
             saved_player.clearMemory()
             saved_player.currentLevel = None
             fileio.save_game(saved_player, new_floor)
+            curlev.close()
             return
         except exc.PlayerDeath:
             curlev.messages.say("You die.")
             kb.pause(curlev.messages)
+            curlev.close()
             return
 
+PROFILE_VARIABLE = "SPIRIT_PROFILE"
+PROFILE_MODES = ("sample", "cprofile")
+CPROFILE_PATH = "profile.pr"
+
+def profile_mode(args):
+    """
+    Return the profiler mode asked for by the command-line arguments args or
+    by the environment, or None if the game is not to be profiled.
+    """
+
+    mode = os.environ.get(PROFILE_VARIABLE) or None
+    for arg in args:
+        if arg == "--profile":
+            mode = "sample"
+        elif arg.startswith("--profile="):
+            mode = arg[len("--profile="):]
+
+    if mode is not None and mode not in PROFILE_MODES:
+        raise ValueError("There is no profiler mode named %s." % mode)
+    return mode
+
 def entry():
     main()
 
 def prof():
-    cProfile.run('entry()', 'profile.pr')
+    cProfile.run('entry()', CPROFILE_PATH)
+
+def sample():
+    """
+    Play the game with the sampling profiler running, and write its samples
+    out when the game ends.
+    """
+
+    sampler.profiler.start()
+    try:
+        entry()
+    finally:
+        sampler.profiler.stop()
+        sampler.profiler.writeCollapsed()
 
 if __name__ == "__main__":
-    if USE_PROFILER:
+    mode = profile_mode(sys.argv[1:])
+    if mode == "cprofile":
         prof()
+    elif mode == "sample":
+        sample()
     else:
         entry()
@@ -9,8 +9,8 @@ import level
 import log
 import dude
 import events
-import config
 import fileio
+import symbol
 
 NUM_SECTORS_X = 4
 NUM_SECTORS_Y = 3
@@ -35,7 +35,7 @@ class st:
     CORRIDOR,
     ) = range(4)
 
-def randomDungeon():
+def randomDungeon(stream = rng.DEFAULT):
     """
     Gets a random dungeon, using a very simple room/corridor model.
     
@@ -45,6 +45,8 @@ def randomDungeon():
     to adjacent rooms and corridors.
     
     This is coded terribly because it will be replaced someday.
+
+    stream - the rng.RNG the dungeon is laid out with.
     """
     
     map_dimensions = (MAX_SIZE_X, MAX_SIZE_Y)
@@ -63,7 +65,7 @@ def randomDungeon():
     sector_types = {}
     for x in range(NUM_SECTORS_X):
         for y in range(NUM_SECTORS_Y):
-            percent = rng.randInt(1, 100)
+            percent = stream.randInt(1, 100)
             if percent <= 25:
                 sector_types[(x, y)] = st.ROOM
             elif percent <= 60:
@@ -83,12 +85,12 @@ def randomDungeon():
 
         if sector_types[sector_coords] in (st.ROOM, st.DOUBLE_ROOM):
             (room_nwcoords[sector_coords], room_secoords[sector_coords]) \
-                = choose_room_corners(sector_nw, sector_se)
+                = choose_room_corners(sector_nw, sector_se, stream)
                     
         elif sector_types[sector_coords] == st.CORRIDOR:
             # A corridor is currently implemented as just a 1-space room.
-            corridor_coords = (rng.randInt(sector_nw[0], sector_se[0]),
-                rng.randInt(sector_nw[1], sector_se[1]))
+            corridor_coords = (stream.randInt(sector_nw[0], sector_se[0]),
+                stream.randInt(sector_nw[1], sector_se[1]))
 
             room_nwcoords[sector_coords] = corridor_coords
             room_secoords[sector_coords] = corridor_coords
@@ -121,17 +123,17 @@ def randomDungeon():
     for accessible in sector_is_accessible.items():
         if sector_types[accessible[0]] != 0 and not accessible[1]:
             # Oops.  Give up and try again.
-            return randomDungeon()
+            return randomDungeon(stream)
     
-    entrance_sector = rng.choice([coords for coords in sector_types.keys() 
+    entrance_sector = stream.choice([coords for coords in sector_types.keys() 
                                  if sector_types[coords] in 
                                  (st.ROOM, st.DOUBLE_ROOM)])
-    exit_sector = rng.choice([coords for coords in sector_types.keys() 
+    exit_sector = stream.choice([coords for coords in sector_types.keys() 
                               if sector_types[coords] in
                               (st.ROOM, st.DOUBLE_ROOM)])
-    entrance_coords = rng.randomPointInRect(room_nwcoords[entrance_sector], 
+    entrance_coords = stream.randomPointInRect(room_nwcoords[entrance_sector], 
                                             room_secoords[entrance_sector])
-    exit_coords = rng.randomPointInRect(room_nwcoords[exit_sector], 
+    exit_coords = stream.randomPointInRect(room_nwcoords[exit_sector], 
                                         room_secoords[exit_sector])
     
     ret_dungeon = level.empty_dungeon(map_dimensions)
@@ -139,12 +141,12 @@ def randomDungeon():
     for coord in sector_list:
         if sector_types[coord] != st.EMPTY:
             if sector_types[coord] == st.CORRIDOR:
-                fill_glyph = level.CORRIDOR_GLYPH
+                fill_tile = level.CORRIDOR_TILE
             else:
-                fill_glyph = level.ROOM_INTERIOR_GLYPH
+                fill_tile = level.ROOM_INTERIOR_TILE
 
             arrays.fill_rect(ret_dungeon, room_nwcoords[coord], 
-                room_secoords[coord], fill_glyph)
+                room_secoords[coord], fill_tile)
             
 # If there is another room to the south or east, make a corridor from this room
 # to it.
@@ -155,10 +157,11 @@ def randomDungeon():
                     and sector_types[adjacent_coord] != 0):
 
                     make_corridor(ret_dungeon,
-                        rng.randomPointInRect(room_nwcoords[coord], 
+                        stream.randomPointInRect(room_nwcoords[coord], 
                                               room_secoords[coord]),
-                        rng.randomPointInRect(room_nwcoords[adjacent_coord], 
-                                              room_secoords[adjacent_coord]))
+                        stream.randomPointInRect(room_nwcoords[adjacent_coord], 
+                                              room_secoords[adjacent_coord]),
+                        stream)
 
 # If the room type is DOUBLE_ROOM, bolt on a second room to the first.
 # This room can overflow! That is intentional.
@@ -166,40 +169,42 @@ def randomDungeon():
                 max_second_se = (room_secoords[coord][0] + MIN_ROOM_SIZE,
                                  room_secoords[coord][1] + MIN_ROOM_SIZE)
                 (second_nw, second_se) = choose_room_corners(
-                    room_nwcoords[coord], max_second_se)
+                    room_nwcoords[coord], max_second_se, stream)
 
                 arrays.fill_rect(ret_dungeon, second_nw, second_se, 
-                    level.ROOM_INTERIOR_GLYPH)
+                    level.ROOM_INTERIOR_TILE)
     
-    ret_dungeon[entrance_coords] = level.UPSTAIRS_GLYPH
-    ret_dungeon[exit_coords] = level.DOWNSTAIRS_GLYPH
+    ret_dungeon[entrance_coords] = level.UPSTAIRS_TILE
+    ret_dungeon[exit_coords] = level.DOWNSTAIRS_TILE
     
     return ret_dungeon
 
-def choose_room_corners(possible_nw, possible_se):
+def choose_room_corners(possible_nw, possible_se, stream = rng.DEFAULT):
     """
     Generate possible northwest and southeast corners for a room.
 
     possible_nw: the upper-left-most possible square in which the room can be.
     possible_se: the lower-right-most possible square in which the room can be.
+    stream: the rng.RNG the corners are chosen with.
     """
     if (possible_nw[0] + MIN_ROOM_SIZE > possible_se[0]
         or possible_nw[1] + MIN_ROOM_SIZE > possible_se[1]):
         raise ValueError("Not enough room for a room in %s, %s."
             % (possible_nw, possible_se))
     while True:
-        room_nw = (rng.randInt(possible_nw[0], possible_se[0]),
-                    rng.randInt(possible_nw[1], possible_se[1]))
-        room_se = (room_nw[0] + rng.randInt(MIN_ROOM_SIZE, MAX_ROOM_SIZE),
-                  (room_nw[1] + rng.randInt(MIN_ROOM_SIZE, MAX_ROOM_SIZE)))
+        room_nw = (stream.randInt(possible_nw[0], possible_se[0]),
+                    stream.randInt(possible_nw[1], possible_se[1]))
+        room_se = (room_nw[0] + stream.randInt(MIN_ROOM_SIZE, MAX_ROOM_SIZE),
+                  (room_nw[1] + stream.randInt(MIN_ROOM_SIZE, MAX_ROOM_SIZE)))
             
         # check validity of room dimensions
         if room_se[0] <= possible_se[0] and room_se[1] <= possible_se[1]:
             return (room_nw, room_se)
 
-def make_corridor(dungeon, start_coords, end_coords):
+def make_corridor(dungeon, start_coords, end_coords, stream = rng.DEFAULT):
     """
-    Modifies the dungeon given to construct a corridor.
+    Modifies the dungeon given to construct a corridor, choosing where it
+    turns with the rng.RNG stream.
     """
     
     # Identify the dimension over which most of the travel is happening, and
@@ -221,7 +226,7 @@ def make_corridor(dungeon, start_coords, end_coords):
     
     # The kink is the major dimension coordinate at which the corridor starts
     # moving on the minor dimension, not the major dimension.
-    kink_major_coordinate = rng.randInt(first_coords[major_dimension], 
+    kink_major_coordinate = stream.randInt(first_coords[major_dimension], 
                                         last_coords[major_dimension])
     
     for major_coordinate in range(first_coords[major_dimension], 
@@ -230,8 +235,8 @@ def make_corridor(dungeon, start_coords, end_coords):
         current_coords[major_dimension] = major_coordinate
         current_coords[minor_dimension] = first_coords[minor_dimension]
         current_coords = tuple(current_coords)
-        if dungeon[current_coords] == config.TRANSPARENT_GLYPH:
-            dungeon[current_coords] = level.CORRIDOR_GLYPH
+        if dungeon[current_coords] == symbol.TRANSPARENT_TILE:
+            dungeon[current_coords] = level.CORRIDOR_TILE
     
     if first_coords[minor_dimension] <= last_coords[minor_dimension]:
         minor_coordinate_range = range(first_coords[minor_dimension], 
@@ -245,8 +250,8 @@ def make_corridor(dungeon, start_coords, end_coords):
         current_coords[major_dimension] = kink_major_coordinate
         current_coords[minor_dimension] = minor_coordinate
         current_coords = tuple(current_coords)
-        if dungeon[current_coords] == config.TRANSPARENT_GLYPH:
-            dungeon[current_coords] = level.CORRIDOR_GLYPH
+        if dungeon[current_coords] == symbol.TRANSPARENT_TILE:
+            dungeon[current_coords] = level.CORRIDOR_TILE
     
     for major_coordinate in range(kink_major_coordinate, 
                                   last_coords[major_dimension] + 1):
@@ -254,22 +259,22 @@ def make_corridor(dungeon, start_coords, end_coords):
         current_coords[major_dimension] = major_coordinate
         current_coords[minor_dimension] = last_coords[minor_dimension]
         current_coords = tuple(current_coords)
-        if dungeon[current_coords] == config.TRANSPARENT_GLYPH:
-            dungeon[current_coords] = level.CORRIDOR_GLYPH
+        if dungeon[current_coords] == symbol.TRANSPARENT_TILE:
+            dungeon[current_coords] = level.CORRIDOR_TILE
 
-def populate_level(pop_level, floor_def):
+def populate_level(pop_level, floor_def, monster_count = NUMBER_OF_MONSTERS):
     """
-    Populate a given level with monsters.
+    Populate a given level with monster_count monsters.
     """
 
     level_nwcorner = (0, 0)
     level_secorner = [dim - 1 for dim in pop_level.dimensions]
 
-    for i in range(NUMBER_OF_MONSTERS):
-        monster_to_be_made = floor_def.getRandomMonster()
+    for i in range(monster_count):
+        monster_to_be_made = floor_def.getRandomMonster(pop_level.rng.mapgen)
         monster_has_been_created = False
         while not monster_has_been_created:
-            monster_coords = rng.randomPointInRect(
+            monster_coords = pop_level.rng.mapgen.randomPointInRect(
                 level_nwcorner, level_secorner)
             if (pop_level.dungeonGlyph(monster_coords) in 
                 level.PASSABLE_TERRAIN
@@ -278,56 +283,60 @@ def populate_level(pop_level, floor_def):
                 pop_level.addDude(monster_to_be_made, monster_coords, False)
                 monster_has_been_created = True
 
-def _randomLevel(floor_def, player):
+def _randomLevel(floor_def, player, streams):
     """
     If no player is supplied, the player slot is just left empty.
     """
 
-    dungeon = randomDungeon()
-    ret_level = constructLevelFromDungeon(dungeon, floor_def, player)
+    dungeon = randomDungeon(streams.mapgen)
+    ret_level = constructLevelFromDungeon(dungeon, floor_def, player, streams)
     
     populate_level(ret_level, floor_def)
 
     return ret_level
 
-def _bossLevel(monster_factory, player):
+def _bossLevel(monster_factory, player, streams):
     
     dungeon = fileio.getCustomDungeon("final.map")
     floor_def = level.FloorDefinition(8, (), monster_factory)
-    ret_level = constructLevelFromDungeon(dungeon, floor_def, player)
+    ret_level = constructLevelFromDungeon(dungeon, floor_def, player, streams)
     ret_level.addEvent(events.SummoningEvent(ret_level), 0)
     return ret_level
 
-def nextLevel(floor_def, floor, player):
+def nextLevel(floor_def, floor, player, streams = rng.DEFAULT_STREAMS):
     """
     Return a level corresponding to the floor given.
+
+    streams - the rng.Streams the level is made and played with.
     """
 
     if floor == 8:
-        return _bossLevel(floor_def[1].monster_factory, player)
+        return _bossLevel(floor_def[1].monster_factory, player, streams)
     else:
-        return _randomLevel(floor_def[floor], player)
+        return _randomLevel(floor_def[floor], player, streams)
 
-def constructLevelFromDungeon(dungeon, floor_def, player):
+def constructLevelFromDungeon(dungeon, floor_def, player,
+                              streams = rng.DEFAULT_STREAMS):
     """
-    Returns an unpopulated but playable level using the dungeon given.
+    Returns an unpopulated but playable level using the dungeon given, which
+    will be played with the rng.Streams given.
     """
 
     elements = level.empty_elements(dungeon.shape)
     
-    entrance_coords = arrays.index(level.DOWNSTAIRS_GLYPH, dungeon)
+    entrance_coords = arrays.index(level.DOWNSTAIRS_TILE, dungeon)
     # Currently, the > glyph is not used in the game, as downward travel cannot
     # happen.
     # elements[entrance_coords] = level.DOWNSTAIRS_GLYPH
-    dungeon[entrance_coords] = level.ROOM_INTERIOR_GLYPH
+    dungeon[entrance_coords] = level.ROOM_INTERIOR_TILE
     
-    exit_coords = arrays.find(level.UPSTAIRS_GLYPH, dungeon)
+    exit_coords = arrays.find(level.UPSTAIRS_TILE, dungeon)
     if exit_coords is not None:
         elements[exit_coords] = level.UPSTAIRS_GLYPH
-        dungeon[exit_coords] = level.ROOM_INTERIOR_GLYPH
+        dungeon[exit_coords] = level.ROOM_INTERIOR_TILE
     
     ret_level = level.Level(dungeon.shape, floor_def.floor, None, elements, 
-        dungeon, floor_def)
+        dungeon, floor_def, streams)
     
     if player is not None:
         ret_level.addPlayer(player, entrance_coords)
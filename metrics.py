@@ -0,0 +1,221 @@
+"""
+Timers and counters for the parts of the game which run every turn, to find
+out where a slow turn went.
+
+Nothing is recorded unless enabled is True.  The code being measured checks
+enabled before it so much as reads the clock, so that measuring costs one
+lookup of a module attribute when it is turned off.
+
+The names of the timers and counters kept are:
+level.next - Level.next(), the whole of a dude's or event's turn.
+act - each dude's or event's act() calls, whoever it is.
+act.<name> - the act() calls of the dudes or events with one name.
+fov.recompute - fields of view calculated afresh by the fov backend; these are
+    the misses of the cache fov.recalculate() keeps.
+fov.cache_hits - fields of view fov.recalculate() reused instead.
+pf.find_shortest_path - searches for paths.
+pf.nodes_expanded - the squares those searches expanded.
+level.refresh_maps - rebuilds of a Level's composite map.
+display.frame - screens handed to the renderer.
+display.cells_drawn - the cells the renderer sent to the console.
+"""
+
+import time
+
+# If True, timers and counters are recorded.
+enabled = False
+
+# The clock the timers are read from.  Python 2 has no monotonic clock, so the
+# wall clock is used there.
+clock = getattr(time, "monotonic", time.time)
+
+SLOWEST_ACTORS = 5
+
+def actor_name(actor):
+    """
+    Return a name for whatever took a turn on a Level.
+    """
+
+    if actor is None:
+        return "nothing"
+    elif hasattr(actor, "name"):
+        return actor.name
+    else:
+        return actor.__class__.__name__
+
+class Timer(object):
+    """
+    The times taken by many runs of one piece of code.
+
+    Fields:
+    count - the number of runs timed.
+    total - the seconds taken by every run, added together.
+    longest - the seconds taken by the slowest run.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+
+    def record(self, seconds):
+        """
+        Count a run which took the number of seconds given.
+        """
+
+        self.count += 1
+        self.total += seconds
+        if seconds > self.longest:
+            self.longest = seconds
+
+    def mean(self):
+        """
+        Return the average number of seconds a run took.
+        """
+
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+class Metrics(object):
+    """
+    The timers and counters recorded while enabled is True.
+
+    A turn, for the purposes of slowestActors(), starts when the player acts
+    and ends when the player next acts.
+
+    Fields:
+    counters - a dict from the name of each counter to its value.
+    timers - a dict from the name of each timer to its Timer.
+    turn_actors - a list of pairs (seconds, name) of the acts of the turn in
+        progress, in the order they happened.
+    last_turn - the same, for the last turn to finish.
+    dump_path - the file the report is appended to every dump_interval
+        seconds by maybeDump(), or None if it is not dumped.
+    dump_interval - the number of seconds between dumps.
+    next_dump - the time on clock() after which maybeDump() next dumps.
+    """
+
+    def __init__(self):
+        self.dump_path = None
+        self.dump_interval = 0.0
+        self.next_dump = 0.0
+        self.reset()
+
+    def reset(self):
+        """
+        Set every timer and counter back to 0.
+        """
+
+        self.counters = {}
+        self.timers = {}
+        self.turn_actors = []
+        self.last_turn = []
+
+    def count(self, name, amount = 1):
+        """
+        Add amount to the counter named.
+        """
+
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def time(self, name, seconds):
+        """
+        Record a run of the timer named which took the number of seconds
+        given.
+        """
+
+        if name not in self.timers:
+            self.timers[name] = Timer()
+        self.timers[name].record(seconds)
+
+    def actorTook(self, actor, seconds):
+        """
+        Record the seconds a dude or event took to act.
+        """
+
+        name = actor_name(actor)
+        self.time("act", seconds)
+        self.time("act." + name, seconds)
+        if actor.isPlayer():
+            self.last_turn = self.turn_actors
+            self.turn_actors = []
+        self.turn_actors.append((seconds, name))
+
+    def slowestActors(self, count = SLOWEST_ACTORS):
+        """
+        Return a list of the count slowest acts of the last turn, as pairs
+        (seconds, name), slowest first.
+        """
+
+        return sorted(self.last_turn, reverse = True)[:count]
+
+    def lines(self):
+        """
+        Return a report of every timer and counter as a list of lines of text.
+        """
+
+        ret_lines = []
+        for name in sorted(self.timers.keys()):
+            timer = self.timers[name]
+            ret_lines.append("%s: %d, %.3fms total, %.3fms mean, %.3fms max"
+                % (name, timer.count, timer.total * 1000, timer.mean() * 1000,
+                   timer.longest * 1000))
+        for name in sorted(self.counters.keys()):
+            ret_lines.append("%s: %d" % (name, self.counters[name]))
+        for (seconds, name) in self.slowestActors():
+            ret_lines.append("slow last turn: %s, %.3fms"
+                             % (name, seconds * 1000))
+        return ret_lines
+
+    def dump(self, path):
+        """
+        Append the report to the file at path, under a line giving the time.
+        """
+
+        with open(path, 'a') as dump_file:
+            dump_file.write("-- %s\n" % time.strftime("%Y-%m-%d %H:%M:%S"))
+            for line in self.lines():
+                dump_file.write(line + "\n")
+
+    def dumpEvery(self, path, interval):
+        """
+        Have maybeDump() append the report to the file at path every interval
+        seconds.  If path is None, stop dumping.
+        """
+
+        self.dump_path = path
+        self.dump_interval = interval
+        self.next_dump = clock() + interval
+
+    def maybeDump(self):
+        """
+        Dump the report if dumpEvery() asked for it and it is time to.
+        """
+
+        if self.dump_path is not None and clock() >= self.next_dump:
+            self.dump(self.dump_path)
+            self.next_dump = clock() + self.dump_interval
+
+stats = Metrics()
+
+def enable(dump_path = None, dump_interval = 60.0):
+    """
+    Start recording, and, if dump_path is not None, append the report to the
+    file at dump_path every dump_interval seconds.
+    """
+
+    global enabled
+
+    enabled = True
+    stats.dumpEvery(dump_path, dump_interval)
+
+def disable():
+    """
+    Stop recording and dumping.  What has been recorded is kept.
+    """
+
+    global enabled
+
+    enabled = False
+    stats.dumpEvery(None, 0.0)
@@ -1,8 +1,9 @@
 import sys
 
+import numpy
+
 import tcod_display as display
 import exc
-import rng
 import config
 import dude
 import level
@@ -14,12 +15,17 @@ import cards
 import events
 import cond
 import kb
+import sampler
 kp = kb.kp
 
 import log
 
 PLAYER_GLYPH = symbol.Glyph('@', (255, 255, 255))
 
+# While a fast-forward condition drives the player, the screen is drawn at
+# least once every FAST_FORWARD_TICKS ticks of game time.
+FAST_FORWARD_TICKS = 20 * config.TURN_TICKS
+
 class Player(dude.Dude):
     """
     The player, or at least his representation in the game.
@@ -29,8 +35,11 @@ class Player(dude.Dude):
     Fields:
     Dude fields are still present.
     deck: the player's deck of cards.
-    self.memory: a set of coordinates representing those places the player has
-        seen.
+    self.memory: a boolean array covering the current level, True at those
+        places the player has seen; or None if the player has not yet seen
+        anything there.
+    last_frame_time: the time on the current level at which the screen was
+        last drawn for the player, or None if it has not been.
     """
 
     def __init__(self, name, coords, speed = 72, currentLevel = None, char_level = 1, deck = None):
@@ -54,8 +63,33 @@ class Player(dude.Dude):
 
         self.deck = deck
 
-        self.memory = set()
-        self.fov.updateMemory(self.memory)
+        self.memory = None
+        self.last_frame_time = None
+
+    def __getstate__(self):
+        """
+        Pickle the player's memory as packed bits, rather than a byte per
+        square.
+        """
+
+        state = self.__dict__.copy()
+        if self.memory is not None:
+            state["memory"] = (self.memory.shape,
+                               numpy.packbits(self.memory).tostring())
+        return state
+
+    def __setstate__(self, state):
+        self.last_frame_time = None
+        self.__dict__.update(state)
+# Saves made before memory was a bitmap hold a set of coordinates instead.
+# The player's memory is cleared between floors anyway, so forget it.
+        if not isinstance(self.memory, tuple):
+            self.memory = None
+        if self.memory is not None:
+            (shape, bits) = self.memory
+            unpacked = numpy.unpackbits(numpy.fromstring(bits, numpy.uint8))
+            self.memory = unpacked[:shape[0] * shape[1]].reshape(shape) \
+                .astype(bool)
 
     def getType(self):
         return dude.qt.PLAYER
@@ -99,12 +133,10 @@ class Player(dude.Dude):
         """
         self.resetFOV()
 
-        display.refresh_screen(self.currentLevel)
-
-# Clear the message buffer.
-        self.currentLevel.messages.archive()
-
         cond_action = self.getConditionAction()
+        if cond_action is None or not self.isFastForwarding():
+            self.showFrame()
+
         if cond_action is None:
 # First, get an action.  The entire purpose of these lines is to get an action
 # which can then be performed.  If they return instead, they should return
@@ -206,12 +238,52 @@ class Player(dude.Dude):
                     return action.DoNothing()
                 else:
                     del self.deck.hand[card_id]
-                    return action.Heal(self, self, 
-                        rng.XdY(2, 7 + self.char_level), False)
+                    heal_roll = self.currentLevel.rng.combat.XdY(2,
+                        7 + self.char_level)
+                    return action.Heal(self, self, heal_roll, False)
 # If the key is the "go upstairs" key, try to go up a level.
             elif key == kp.UP:
                 if self.currentLevel.elements[self.coords] == level.UPSTAIRS_GLYPH:
         	        return action.Up()
+# If the key is the profiler key, start or stop the sampling profiler.  Only
+# wizards may do this.
+            elif key == kp.PROFILE and config.WIZARD:
+                if sampler.profiler.isRunning():
+                    sampler.profiler.stop()
+                    sampler.profiler.writeCollapsed()
+                    self.currentLevel.messages.say(
+                        "Profiling stopped; samples written to %s."
+                        % sampler.COLLAPSED_PATH)
+                else:
+                    sampler.profiler.start()
+                    self.currentLevel.messages.say("Profiling started.")
+
+    def isFastForwarding(self):
+        """
+        Return True if a fast-forward condition is driving the player, and
+        the screen has been drawn within the last FAST_FORWARD_TICKS ticks.
+        """
+
+        if self.last_frame_time is None:
+            return False
+        since_frame = self.currentLevel.time - self.last_frame_time
+        if not 0 <= since_frame < FAST_FORWARD_TICKS:
+            return False
+
+        for condition in self.conditions.values():
+            if condition.fast_forward:
+                return True
+        return False
+
+    def showFrame(self):
+        """
+        Draw the screen, and then clear the message buffer, since the messages
+        in it have now been shown.
+        """
+
+        display.refresh_screen(self.currentLevel)
+        self.currentLevel.messages.archive()
+        self.last_frame_time = self.currentLevel.time
 
     def useCard(self, card_id):
         """
@@ -280,7 +352,8 @@ class Player(dude.Dude):
         """
         Obtain the card related to mon, and shuffle it into the deck library.
         """
-        self.deck.randomInsert(cards.mon_card(mon))
+        self.deck.randomInsert(cards.mon_card(mon),
+                               self.currentLevel.rng.combat)
     
     def die(self):
         raise exc.PlayerDeath()
@@ -304,8 +377,10 @@ class Player(dude.Dude):
         player's memory.
         """
         
-        self.fov.recalculate(self.currentLevel, self.coords)
-        self.fov.updateMemory(self.memory)
+        if self.fov.recalculate(self.currentLevel, self.coords):
+            if self.memory is None:
+                self.memory = numpy.zeros(self.currentLevel.dimensions, bool)
+            self.fov.updateMemory(self.memory)
 
     def clearMemory(self):
         """
@@ -313,7 +388,8 @@ class Player(dude.Dude):
         new level.
         """
 
-        self.memory = set()
+        self.memory = None
+        self.fov.invalidate()
 
 class Sidebar(object):
     """
@@ -1,7 +1,11 @@
 import collections
+import heapq
+
+import numpy
 
 import coordinates
 import exc
+import metrics
 
 """
 Pathfinding tools.
@@ -11,7 +15,70 @@ Note that a "path" is a list of the form:
 where each element is adjacent to the element before.
 """
 
-def find_shortest_path(level_, source, destination, destination_must_be_clear = False):
+UNREACHABLE = -1
+
+def distance_map(level_, source):
+    """
+    Find the number of moves needed to reach source from each square of the
+    level.
+
+    Monsters are not taken into account; only the dungeon layout is.
+
+    level_ - the level being searched.
+    source - the square the distances are measured to.
+
+    Returns: an array of integers with the level's dimensions, holding the
+        distance from each square to the source, or UNREACHABLE for those
+        squares which cannot reach it.
+    """
+
+    distances = numpy.empty(level_.dimensions, 'i')
+    distances.fill(UNREACHABLE)
+    distances[source] = 0
+
+# Every legal move has a legal move back, so the squares reachable from source
+# are exactly those from which source is reachable.
+    horizon = collections.deque([source])
+    while horizon:
+        square = horizon.popleft()
+        next_distance = distances[square] + 1
+        for adjacent in level_.immediately_accessible_squares(square):
+            if distances[adjacent] == UNREACHABLE:
+                distances[adjacent] = next_distance
+                horizon.append(adjacent)
+
+    return distances
+
+def downhill_step(level_, distances, source):
+    """
+    Find a square to move to from source which is closer to the destination of
+    a distance map and which does not have a monster on it.
+
+    level_ - the level on which the move is made.
+    distances - a distance map, as returned by distance_map().
+    source - the square being moved from.
+
+    Returns: the coordinates of the closest such square, or None if there is
+        none; that is, if source cannot reach the destination, or if every
+        square closer to it is blocked by a monster.
+    """
+
+    current_distance = distances[source]
+    if current_distance == UNREACHABLE:
+        return None
+
+    best_square = None
+    best_distance = current_distance
+    for square in level_.immediately_accessible_squares(source):
+        if distances[square] < best_distance \
+            and square not in level_.dudeLayer:
+
+            best_square = square
+            best_distance = distances[square]
+
+    return best_square
+
+def find_shortest_path(level_, source, destination, destination_must_be_clear = False, node_budget = None):
     """
     Find the shortest path between two coordinates on the level.
     
@@ -23,12 +90,18 @@ def find_shortest_path(level_, source, destination, destination_must_be_clear =
     destination - the end of the path.
     destination_must_be_clear - True if the pathfinding should fail if the
         destination has a monster on it.  False otherwise.
+    node_budget - the greatest number of squares the search may expand before
+        giving up, or None if the search may expand the whole level.
 
     Returns: a list containing the shortest path between the source and the 
         destination, or the empty list, if no such path exists.
     """
     
     if destination_must_be_clear:
+# No path can end on an occupied square, so don't search the level for one.
+        if destination != source and destination in level_.dudeLayer:
+            return []
+
         def adjacent_squares_function(square):
             passable_coords = level_.immediately_accessible_squares(square)
             no_monster_coords = [i for i in passable_coords if 
@@ -43,39 +116,148 @@ def find_shortest_path(level_, source, destination, destination_must_be_clear =
                  or (i in (source, destination)))]
             return no_monster_coords
     
+    measuring = metrics.enabled
+    if measuring:
+        start = metrics.clock()
     try:
-        return _find_shortest_path(level_.dimensions, adjacent_squares_function, source, destination)
+        return _find_shortest_path(level_.dimensions, adjacent_squares_function, source, destination, node_budget)
     except exc.PathfindingError:
         return []
+    finally:
+        if measuring:
+            metrics.stats.time("pf.find_shortest_path",
+                               metrics.clock() - start)
+
+class _SearchBuffers(object):
+    """
+    The scratch space used by _find_shortest_path() on grids of one size, kept
+    between searches so that it need not be allocated or cleared each time.
 
-def _find_shortest_path(dimensions, adjacent_squares_function, source, destination):
+    Rather than being cleared, each search is given a new generation number.
+    A square's entries in costs and predecessors are only meaningful if its
+    entry in seen holds the current generation, and it is only closed if its
+    entry in closed does.
+
+    Fields:
+    generation - the generation number of the latest search.
+    seen - nested lists, seen[x][y] being the last generation in which the
+        square (x, y) was put on the open list.
+    closed - nested lists, closed[x][y] being the last generation in which the
+        square (x, y) was expanded.
+    costs - nested lists of the lengths of the shortest paths found so far to
+        each square.
+    predecessors - nested lists of the squares before each square on those
+        paths.
+    open_list - a heap of tuples of the form
+        (estimated path length, estimated distance remaining, square).
+    """
+
+    def __init__(self, dimensions):
+        self.generation = 0
+        self.seen = [[0] * dimensions[1] for i in range(dimensions[0])]
+        self.closed = [[0] * dimensions[1] for i in range(dimensions[0])]
+        self.costs = [[0] * dimensions[1] for i in range(dimensions[0])]
+        self.predecessors = [[None] * dimensions[1] for i in range(dimensions[0])]
+        self.open_list = []
+
+    def nextGeneration(self):
+        """
+        Start a new search, and return its generation number.
+        """
+
+        self.generation += 1
+        del self.open_list[:]
+        return self.generation
+
+# A dict whose keys are grid dimensions, and whose values are the
+# _SearchBuffers for grids of those dimensions.
+_search_buffers = {}
+
+def _find_shortest_path(dimensions, adjacent_squares_function, source, destination, node_budget = None):
     """
     Find the shortest path between two coordinates on an grid.
 
+    This is an A* search, guided by coordinates.minimumPath(), which never
+    overestimates the number of steps left since each step moves at most one
+    square in each direction.  The path found is therefore a shortest one.
+
     dimensions - the dimensions of the grid.
     adjacent_squares_function - a function of the form:
         adjacent_squares_function(square): return an iterable of the
         squares adjacent to square.
     source - the beginning of the path.
     destination - the end of the path.
+    node_budget - the greatest number of squares which may be expanded before
+        the search fails, or None if there is no limit.
 
     Returns: a list containing the shortest path between the source and the
         destination.
+
+    Raises a PathfindingError if there is no such path, or if none was found
+        within the node budget.
     """
-    
-    predecessors = _breadth_first_search_predecessors(dimensions, adjacent_squares_function, source, destination)
-    if destination not in predecessors:
-        raise PathfindingError("No path exists between %s and %s!"
-            % (source, destination))
-    else:
-        path = []
-        current_square = destination
-        while predecessors[current_square] is not None:
-            path.insert(0, current_square)
-            current_square = predecessors[current_square]
-        path.insert(0, source)
-
-    return path
+
+    if dimensions not in _search_buffers:
+        _search_buffers[dimensions] = _SearchBuffers(dimensions)
+    buffers = _search_buffers[dimensions]
+    generation = buffers.nextGeneration()
+    seen = buffers.seen
+    closed = buffers.closed
+    costs = buffers.costs
+    predecessors = buffers.predecessors
+    open_list = buffers.open_list
+    heuristic = coordinates.minimumPath
+
+    seen[source[0]][source[1]] = generation
+    costs[source[0]][source[1]] = 0
+    predecessors[source[0]][source[1]] = None
+    remaining = heuristic(source, destination)
+    heapq.heappush(open_list, (remaining, remaining, source))
+    expanded = 0
+
+    while len(open_list) > 0:
+        square = heapq.heappop(open_list)[2]
+        (x, y) = square
+# A square may be on the open list several times, if shorter paths to it were
+# found after it was first put there; only the first copy popped counts.
+        if closed[x][y] == generation:
+            continue
+
+        if square == destination:
+            path = [destination]
+            while predecessors[x][y] is not None:
+                (x, y) = predecessors[x][y]
+                path.append((x, y))
+            path.reverse()
+            if metrics.enabled:
+                metrics.stats.count("pf.nodes_expanded", expanded)
+            return path
+
+        closed[x][y] = generation
+        expanded += 1
+        if node_budget is not None and expanded > node_budget:
+            if metrics.enabled:
+                metrics.stats.count("pf.nodes_expanded", expanded)
+            raise exc.PathfindingError("No path between %s and %s was found within %d squares."
+                % (source, destination, node_budget))
+
+        next_cost = costs[x][y] + 1
+        for adjacent in adjacent_squares_function(square):
+            (adj_x, adj_y) = adjacent
+            if closed[adj_x][adj_y] == generation:
+                continue
+            if seen[adj_x][adj_y] != generation or next_cost < costs[adj_x][adj_y]:
+                seen[adj_x][adj_y] = generation
+                costs[adj_x][adj_y] = next_cost
+                predecessors[adj_x][adj_y] = square
+                remaining = heuristic(adjacent, destination)
+                heapq.heappush(open_list,
+                    (next_cost + remaining, remaining, adjacent))
+
+    if metrics.enabled:
+        metrics.stats.count("pf.nodes_expanded", expanded)
+    raise exc.PathfindingError("%s, the destination, is unreachable from %s, the source."
+        % (destination, source))
 
 def _breadth_first_search_predecessors(dimensions, adjacent_squares_function, source, destination = None):
     """
@@ -2,47 +2,67 @@
 Contains a priority queue.
 """
 
+import heapq
+
 class PriorityQueue():
     """
     An ordered queue.
-    
+
     Each element in the queue is associated with an integer.  The element
     returned first is the one with the lowest integer.  Note that if an element
     is inserted into the queue with the same priority as an existing element,
     the existing element will be returned first, then the new one.
+
+    The queue is a binary heap, so put() and get() take O(log n) time, and
+    membership tests take O(1) time.  Erased entries are not removed from the
+    heap immediately; they are only marked as erased, and skipped when they
+    reach the front of the queue.
     """
 
+# Private state:
+# _heap - a heap of entries, each a list of the form
+#     [priority, sequence number, item, erased], where the sequence number
+#     breaks ties between equal priorities in the order the entries were put.
+# _entries - a dict whose keys are the items in the queue and whose values
+#     are lists of the entries which hold those items and are not yet erased.
+# _size - the number of entries in the queue which are not erased.
+# _next_sequence - the sequence number to be given to the next entry put.
+
     def __init__(self):
-        self._list = []
+        self._heap = []
+        self._entries = {}
+        self._size = 0
+        self._next_sequence = 0
         self.last_item_priority = 0
 
     def __str__(self):
+        live_entries = sorted(entry for entry in self._heap if not entry[3])
         strings = []
-        for i in range(len(self._list)):
-            strings.append("%d -- %d -- %s" % (i, self._list[i][1], str(self._list[i][0])))
+        for i in range(len(live_entries)):
+            strings.append("%d -- %d -- %s" % (i, live_entries[i][0], str(live_entries[i][2])))
         return "\n".join(strings)
 
     def __contains__(self, item):
-        return item in [i[0] for i in self._list]
+        return item in self._entries
+
+    def __len__(self):
+        return self._size
 
     def isEmpty(self):
         """
         Return True if the queue is empty, False otherwise.
         """
-        return len(self._list) == 0
+        return self._size == 0
 
     def put(self, item, priority):
         """
         Put an item of priority 'priority' into the queue.
         """
-        for i in range(len(self._list)):
-            if priority < self._list[i][1]:
-                self._list.insert(i, [item, priority])
-                return
-
-# If execution reaches here, the item doesn't have lesser priority than any of
-# the elements in the queue.  Thus, append it to the end of the queue.
-        self._list.append((item, priority))
+        entry = [priority, self._next_sequence, item, False]
+        self._next_sequence += 1
+        heapq.heappush(self._heap, entry)
+        self._entries.setdefault(item, []).append(entry)
+        self._size += 1
 
     def priority_interval(self):
         """
@@ -52,7 +72,7 @@ class PriorityQueue():
 
         if self.isEmpty():
             raise IndexError("Interval request from empty queue.")
-        return self._list[0][1] - self.last_item_priority
+        return self._front()[0] - self.last_item_priority
 
     def get(self):
         """
@@ -60,31 +80,43 @@ class PriorityQueue():
         """
         if self.isEmpty():
             raise IndexError("Get from empty queue.")
-        self.last_item_priority = self._list[0][1]
-        return self._list.pop(0)[0]
+        self._front()
+        entry = heapq.heappop(self._heap)
+        item = entry[2]
+
+        item_entries = self._entries[item]
+        item_entries.remove(entry)
+        if len(item_entries) == 0:
+            del self._entries[item]
+        self._size -= 1
+
+        self.last_item_priority = entry[0]
+        return item
 
     def erase(self, item):
         """
         Remove item completely from the queue, if it is in the queue.
 
         Raises a ValueError if the item is not in the queue.
-        
+
         item - the item to be erased from the queue.
-        
-        """
-        indices_to_erase = []
-        for i in range(len(self._list)):
-            if item == self._list[i][0]:
-                indices_to_erase.insert(0, i)
 
-        if indices_to_erase == []:
+        """
+        if item not in self._entries:
             raise ValueError("PriorityQueue.erase(): item not in queue")
 
-        for index in indices_to_erase:
-# Iterate BACKWARDS through the indices that should be erased.  This way,
-# if indices 1 and 7 must be deleted, deleting 1 doesn't make 7 harder to reach
-# (as it's now 6 instead).  indices_to_erase is already in decreasing order,
-# so it's already backwards!
-            del self._list[index]
+        for entry in self._entries.pop(item):
+            entry[3] = True
+            self._size -= 1
 
         return
+
+    def _front(self):
+        """
+        Discard any erased entries at the front of the heap, then return the
+        entry at the front.  The queue must not be empty.
+        """
+
+        while self._heap[0][3]:
+            heapq.heappop(self._heap)
+        return self._heap[0]
@@ -1,9 +1,105 @@
 """
 A random number generator, which includes various common functions.
+
+The module-level functions draw from the global random module, as they always
+have.  A game which must be reproducible, or which shares its process with
+other games, should instead draw from the RNGs of a Streams of its own.
 """
 
 import random
 
+class RNG(object):
+    """
+    A source of random numbers, with the functions the game uses.
+
+    Fields:
+    source - the random.Random the numbers are drawn from.
+    """
+
+    def __init__(self, source):
+        self.source = source
+
+    def randInt(self, start, stop):
+        """
+        Get a random integer in the range [start, stop].
+        """
+
+        return self.source.randint(start, stop)
+
+    def choice(self, sequence):
+        """
+        Return a random member of this sequence.
+        """
+
+        return self.source.choice(sequence)
+
+    def random_insert(self, list_, element):
+        """
+        Insert element into a random place in list_.
+
+        list_ - the list (or other item that implements the list insert).
+        element - the thing to inset into the list.
+        """
+
+        list_.insert(self.randInt(0, len(list_)), element)
+
+    def percentChance(self, percent_integer):
+        """
+        Has a percent_integer percent chance of returning True; otherwise,
+        False.
+        """
+
+        return self.source.randint(1, 100) <= percent_integer
+
+    def XdY(self, X, Y):
+        """Return X rolls of a Y-sided die, added together."""
+
+        ret_value = 0
+        for i in range(X):
+            ret_value += self.randInt(1, Y)
+
+        return ret_value
+
+    def randomPointInRect(self, nw_corner, se_corner):
+        """
+        Returns a random point within the box described, inclusive.
+        """
+
+        return (self.randInt(nw_corner[0], se_corner[0]),
+                self.randInt(nw_corner[1], se_corner[1]))
+
+class Streams(object):
+    """
+    The RNGs of one game, one for each part of the game, so that one part
+    drawing more or fewer numbers does not change what the others draw.
+
+    Fields:
+    mapgen - the RNG dungeons are laid out and populated with.
+    combat - the RNG attacks, healing and card draws are decided with.
+    ai - the RNG monsters choose their actions with.
+    """
+
+    def __init__(self, mapgen, combat, ai):
+        self.mapgen = mapgen
+        self.combat = combat
+        self.ai = ai
+
+def streams(seed = None):
+    """
+    Return a Streams whose RNGs are independent of each other and of the
+    global random module, all derived from seed; supplies a random seed if
+    none is provided.
+    """
+
+    master = random.Random(seed)
+    return Streams(*[RNG(random.Random(master.getrandbits(64)))
+                     for i in range(3)])
+
+# The RNG of the global random module, and a Streams made of it alone, used
+# wherever no Streams is supplied.
+DEFAULT = RNG(random._inst)
+DEFAULT_STREAMS = Streams(DEFAULT, DEFAULT, DEFAULT)
+
 def initialize(seed = None):
     """
     Initializes the RNG; supplies a random seed if none is provided.
@@ -16,14 +112,14 @@ def randInt(start, stop):
     Get a random integer in the range [start, stop].
     """
     
-    return random.randint(start, stop)
+    return DEFAULT.randInt(start, stop)
 
 def choice(sequence):
     """
     Return a random member of this sequence.
     """
     
-    return random.choice(sequence)
+    return DEFAULT.choice(sequence)
 
 def random_insert(list_, element):
     """
@@ -33,27 +129,23 @@ def random_insert(list_, element):
     element - the thing to inset into the list.
     """
 
-    list_.insert(randInt(0, len(list_)), element)
+    DEFAULT.random_insert(list_, element)
 
 def percentChance(percent_integer):
     """
     Has a percent_integer percent chance of returning True; otherwise, False.
     """
     
-    return random.randint(1, 100) <= percent_integer
+    return DEFAULT.percentChance(percent_integer)
 
 def XdY(X, Y):
     """Return X rolls of a Y-sided die, added together."""
     
-    ret_value = 0
-    for i in range(X):
-        ret_value += randInt(1, Y)
-        
-    return ret_value
+    return DEFAULT.XdY(X, Y)
 
 def randomPointInRect(nw_corner, se_corner):
     """
     Returns a random point within the box described, inclusive.
     """
     
-    return (randInt(nw_corner[0], se_corner[0]), randInt(nw_corner[1], se_corner[1]))
+    return DEFAULT.randomPointInRect(nw_corner, se_corner)
@@ -0,0 +1,153 @@
+"""
+A sampling profiler, which looks at what the game is doing a few hundred times
+a second from a thread of its own, rather than timing every call as cProfile
+does, so that long sessions can be profiled at little cost.
+
+The stacks seen are written out in the collapsed-stack format read by
+flamegraph.pl and its imitators: one line per distinct stack, of the form
+
+    root;caller;callee count
+
+where the root is the tag the profiler had when the stack was seen (the floor
+the game was on, when main sets it).
+"""
+
+import os
+import sys
+import threading
+import time
+
+# The number of seconds between samples.
+INTERVAL = 0.005
+
+# The file the collapsed stacks are written to by default.
+COLLAPSED_PATH = "profile.collapsed"
+
+def frame_name(frame):
+    """
+    Return the name of a stack frame in a collapsed stack: its file and its
+    function.
+    """
+
+    code = frame.f_code
+    return "%s:%s" % (os.path.basename(code.co_filename), code.co_name)
+
+class SamplingProfiler(object):
+    """
+    Samples the stack of one thread at regular intervals.
+
+    Fields:
+    interval - the number of seconds between samples.
+    tag - a string put at the root of every stack sampled, so that samples
+        can be told apart by what the game was doing; main sets it to the
+        floor being played.
+    samples - a dict whose keys are tuples of the form (tag, frame name,
+        frame name, ...), outermost frame first, and whose values are the
+        number of times the stack was seen with that tag.
+    """
+
+# Private state:
+# __thread - the thread taking samples, or None if the profiler is stopped.
+# __target - the ident of the thread being sampled.
+# __stopping - a threading.Event set to ask __thread to stop.
+
+    def __init__(self, interval = INTERVAL):
+        self.interval = interval
+        self.tag = "game"
+        self.samples = {}
+        self.__thread = None
+        self.__target = None
+        self.__stopping = threading.Event()
+
+    def isRunning(self):
+        return self.__thread is not None
+
+    def start(self):
+        """
+        Start sampling the thread which calls start().  Does nothing if the
+        profiler is already running.
+        """
+
+        if self.isRunning():
+            return
+
+        self.__target = threading.current_thread().ident
+        self.__stopping.clear()
+        self.__thread = threading.Thread(target = self.__run,
+                                         name = "sampling profiler")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop sampling, keeping the samples taken.  Does nothing if the
+        profiler is not running.
+        """
+
+        if not self.isRunning():
+            return
+
+        self.__stopping.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def reset(self):
+        """
+        Forget every sample taken.
+        """
+
+        self.samples = {}
+
+    def sample(self):
+        """
+        Record the stack the thread being sampled is in now.
+        """
+
+        frame = sys._current_frames().get(self.__target)
+        if frame is None:
+            return
+
+        stack = []
+        while frame is not None:
+            stack.append(frame_name(frame))
+            frame = frame.f_back
+        stack.append(self.tag)
+        stack.reverse()
+
+        key = tuple(stack)
+        self.samples[key] = self.samples.get(key, 0) + 1
+
+    def __run(self):
+        while not self.__stopping.is_set():
+            time.sleep(self.interval)
+            self.sample()
+
+    def tagTotals(self):
+        """
+        Return a dict from each tag to the number of samples taken with it.
+        """
+
+        totals = {}
+        for (stack, count) in self.samples.items():
+            totals[stack[0]] = totals.get(stack[0], 0) + count
+        return totals
+
+    def collapsedLines(self):
+        """
+        Return the samples as a list of lines in the collapsed-stack format.
+        """
+
+        return ["%s %d" % (";".join(stack), count)
+                for (stack, count) in sorted(self.samples.items())]
+
+    def writeCollapsed(self, path = COLLAPSED_PATH):
+        """
+        Write the samples to the file at path in the collapsed-stack format.
+        """
+
+        with open(path, 'w') as collapsed_file:
+            for line in self.collapsedLines():
+                collapsed_file.write(line + "\n")
+
+# The profiler main and the wizard key use.
+profiler = SamplingProfiler()
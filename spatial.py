@@ -0,0 +1,183 @@
+"""
+A spatial index, for finding the things on a Level near a square without
+looking at every thing on the Level.
+"""
+
+import coordinates
+
+BUCKET_SIZE = 8
+
+class GridIndex(object):
+    """
+    An index of objects by their coordinates.
+
+    The Level is divided into square buckets BUCKET_SIZE squares on a side,
+    each holding the objects inside it, so that a query only looks at the
+    buckets it overlaps.  Every object indexed must have a coords field, and
+    must be moved with move() whenever its coords change.
+
+    Distances are measured as coordinates.minimumPath() measures them, so the
+    squares within a radius of a center form a square around it.
+    """
+
+# Private state:
+# __buckets - a dict whose keys are the (x, y) indices of buckets and whose
+#     values are lists of the objects in those buckets, in the order they were
+#     put there.  Empty buckets are deleted.
+# __size - the number of objects indexed.
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+        self.__buckets = {}
+        self.__size = 0
+
+    def __len__(self):
+        return self.__size
+
+    def add(self, item):
+        """
+        Add an object to the index, at its current coordinates.
+        """
+
+        self.__buckets.setdefault(_bucket_key(item.coords), []).append(item)
+        self.__size += 1
+
+    def remove(self, item, coords = None):
+        """
+        Remove an object from the index.
+
+        Raises a ValueError if the object is not in the index.
+
+        item - the object to be removed.
+        coords - the coordinates at which the object was indexed, if they are
+            not its current ones.
+        """
+
+        if coords is None:
+            coords = item.coords
+        key = _bucket_key(coords)
+        for (i, indexed) in enumerate(self.__buckets.get(key, ())):
+            if indexed is item:
+                break
+        else:
+            raise ValueError("GridIndex.remove(x): x not in index")
+
+        bucket = self.__buckets[key]
+        del bucket[i]
+        if len(bucket) == 0:
+            del self.__buckets[key]
+        self.__size -= 1
+
+    def move(self, item, old_coords):
+        """
+        Re-index an object whose coordinates have changed.
+
+        item - the object, whose coords field holds its new coordinates.
+        old_coords - the coordinates at which the object was indexed.
+        """
+
+        if _bucket_key(old_coords) != _bucket_key(item.coords):
+            self.remove(item, old_coords)
+            self.add(item)
+
+    def inRect(self, nw_corner, se_corner):
+        """
+        Return a list of the objects inside a rectangle.
+
+        nw_corner - the northwest corner of the rectangle.
+        se_corner - the southeast corner of the rectangle.  (Inclusive.)
+        """
+
+        (min_key_x, min_key_y) = _bucket_key(nw_corner)
+        (max_key_x, max_key_y) = _bucket_key(se_corner)
+        ret_list = []
+        for key_x in range(min_key_x, max_key_x + 1):
+            for key_y in range(min_key_y, max_key_y + 1):
+                bucket = self.__buckets.get((key_x, key_y))
+                if bucket is None:
+                    continue
+                for item in bucket:
+                    (x, y) = item.coords
+                    if nw_corner[0] <= x <= se_corner[0] \
+                        and nw_corner[1] <= y <= se_corner[1]:
+
+                        ret_list.append(item)
+        return ret_list
+
+    def inRadius(self, center, radius):
+        """
+        Return a list of the objects at most radius squares from center.
+        """
+
+        return self.inRect((center[0] - radius, center[1] - radius),
+                           (center[0] + radius, center[1] + radius))
+
+    def nearest(self, center, predicate, max_distance = None):
+        """
+        Return the object closest to center for which predicate is True.
+
+        Buckets are searched in rings outward from the one holding center, and
+        the search stops as soon as no unsearched bucket could hold anything
+        closer than the best object found.  Of several objects at the same
+        distance, the one found first is returned.
+
+        center - the coordinates the distance is measured from.
+        predicate - a function of one object, returning True if the object
+            should be considered.
+        max_distance - the greatest distance an object returned may be from
+            center, or None if there is no limit.
+
+        Returns: the object, or None if there is no such object.
+        """
+
+        (center_key_x, center_key_y) = _bucket_key(center)
+        max_ring = max(self.dimensions) // BUCKET_SIZE + 1
+        if max_distance is not None:
+            max_ring = min(max_ring, max_distance // BUCKET_SIZE + 1)
+
+        best = None
+        best_distance = None
+        for ring in range(max_ring + 1):
+# Every square in ring r of buckets is at least (r - 1) * BUCKET_SIZE + 1
+# squares from center.
+            if best is not None and (ring - 1) * BUCKET_SIZE + 1 > best_distance:
+                break
+
+            for key in _ring_keys(center_key_x, center_key_y, ring):
+                bucket = self.__buckets.get(key)
+                if bucket is None:
+                    continue
+                for item in bucket:
+                    distance = coordinates.minimumPath(center, item.coords)
+                    if (max_distance is not None and distance > max_distance) \
+                        or (best is not None and distance >= best_distance):
+                        continue
+                    if predicate(item):
+                        best = item
+                        best_distance = distance
+
+        return best
+
+def _bucket_key(coords):
+    """
+    Return the index of the bucket holding the square at coords.
+    """
+
+    return (coords[0] // BUCKET_SIZE, coords[1] // BUCKET_SIZE)
+
+def _ring_keys(center_key_x, center_key_y, ring):
+    """
+    Return a list of the bucket indices exactly ring buckets from a bucket.
+    """
+
+    if ring == 0:
+        return [(center_key_x, center_key_y)]
+
+    keys = []
+    for key_x in range(center_key_x - ring, center_key_x + ring + 1):
+        keys.append((key_x, center_key_y - ring))
+        keys.append((key_x, center_key_y + ring))
+    for key_y in range(center_key_y - ring + 1, center_key_y + ring):
+        keys.append((center_key_x - ring, key_y))
+        keys.append((center_key_x + ring, key_y))
+    return keys
@@ -1,16 +1,28 @@
 """
 'symbol' handles tiles and such.
 
-Right now, it's pretty boring, as symbols that represent characters are just
-one-element strings.
+A Glyph is a character and a color.  Arrays of glyphs are not stored as arrays
+of Glyph objects; instead, each distinct Glyph is given a small integer, its
+"tile," by the palette, and arrays hold tiles.  The palette can then turn a
+tile back into its Glyph, or an array of tiles into arrays of characters and
+colors.
 """
 
 import collections
 import config
 import arrays
 
+import numpy
+
 REMEMBERED_COLOR = (99, 99, 99)
 
+# The type of the integers stored in an array of tiles.
+TILE_TYPE = numpy.uint16
+
+# The tile of the transparent glyph.  Because it is 0, a freshly zeroed array
+# of tiles is entirely transparent.
+TRANSPARENT_TILE = 0
+
 class Glyph(object):
     """
     The symbol that represents a character.
@@ -42,6 +54,121 @@ class Glyph(object):
 
 BAD_GLYPH = ('!', 255, 0, 0)
 
+class Palette(object):
+    """
+    A table of every distinct glyph in use, indexed by tile.
+
+    Fields:
+    glyphs - a list of Glyphs; glyphs[tile] is the Glyph of that tile.
+    """
+    """
+    __tiles - a dict whose keys are (char, color) pairs and whose values are
+        the tiles of the corresponding glyphs.
+    __chars - an array of the character codes of each tile, or None if it
+        needs to be rebuilt.
+    __colors - an array of the (r, g, b) colors of each tile, or None if it
+        needs to be rebuilt.
+    __recolorings - a dict whose keys are colors and whose values are the
+        arrays returned by getRecolored() for those colors.
+    """
+
+    def __init__(self):
+        self.glyphs = []
+        self.__tiles = {}
+        self.__chars = None
+        self.__colors = None
+        self.__recolorings = {}
+
+# The transparent glyph must be the very first tile.
+        self.tile(Glyph(' ', (0, 0, 0)))
+
+    def __len__(self):
+        return len(self.glyphs)
+
+    def tile(self, glyph):
+        """
+        Return the tile of a glyph, adding the glyph to the palette if it is
+        not already present.
+        """
+
+        key = (glyph.char, glyph.color)
+        try:
+            return self.__tiles[key]
+        except KeyError:
+            if len(self.glyphs) > numpy.iinfo(TILE_TYPE).max:
+                raise OverflowError("The palette has no room for %s." % key)
+            new_tile = len(self.glyphs)
+            self.glyphs.append(Glyph(glyph.char, glyph.color))
+            self.__tiles[key] = new_tile
+            self.__chars = None
+            self.__colors = None
+            return new_tile
+
+    def glyph(self, tile):
+        """
+        Return the glyph represented by a tile.
+        """
+
+        return self.glyphs[tile]
+
+    def getChars(self):
+        """
+        Return an array of the character codes of the glyphs, indexed by tile.
+        """
+
+        if self.__chars is None:
+            self.__chars = numpy.array([ord(g.char) for g in self.glyphs],
+                                       numpy.uint8)
+        return self.__chars
+
+    def getColors(self):
+        """
+        Return an array of shape (len(palette), 3) of the colors of the
+        glyphs, indexed by tile.
+        """
+
+        if self.__colors is None:
+            self.__colors = numpy.array([g.color for g in self.glyphs],
+                                        numpy.uint8).reshape((-1, 3))
+        return self.__colors
+
+    def getRecolored(self, color):
+        """
+        Return an array mapping each tile to the tile of the same character
+        painted in color.  The array is indexed by tile, so
+        getRecolored(color)[tiles] recolors a whole array of tiles at once.
+        """
+
+        table = self.__recolorings.get(color, numpy.zeros(0, TILE_TYPE))
+        if len(table) < len(self.glyphs):
+# Recoloring a glyph may add a new glyph to the palette, so keep going until
+# every glyph, new ones included, has a recolored tile.
+            new_tiles = []
+            while len(table) + len(new_tiles) < len(self.glyphs):
+                old_glyph = self.glyphs[len(table) + len(new_tiles)]
+                new_tiles.append(self.tile(Glyph(old_glyph.char, color)))
+            table = numpy.concatenate((table, numpy.array(new_tiles,
+                                                          TILE_TYPE)))
+            self.__recolorings[color] = table
+
+        return table
+
+palette = Palette()
+
+def tile(glyph):
+    """
+    Return the tile of a glyph in the global palette.
+    """
+
+    return palette.tile(glyph)
+
+def glyph(tile_):
+    """
+    Return the glyph of a tile in the global palette.
+    """
+
+    return palette.glyph(tile_)
+
 class glyphMap(dict):
     """
     A map which returns the transparent glyph on a lookup failure, as long as
@@ -63,6 +190,6 @@ class glyphMap(dict):
     def getArray(self):
         ret_array = arrays.empty_str_array(self.dimensions)
         for key in self:
-            ret_array[key] = self[key]
+            ret_array[key] = tile(self[key])
 
         return ret_array
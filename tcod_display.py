@@ -4,19 +4,142 @@ A module to do various things with the Doryen library.
 
 import arrays
 import config
+import metrics
 import symbol
 
+import numpy
 import sys
+# libtcod itself is only imported by the functions which use it, so that games
+# can be played with the NullRenderer where libtcod cannot be loaded.
 sys.path.append("libtcod")
-import libtcodpy as tcod
-# import libtcodpy as tcod
+
+# If True, the display sends whole planes of color to the console at once;
+# otherwise, it prints cells one by one.
+BULK_UPLOAD = True
 
 level_cache = None
 
+class Renderer(object):
+    """
+    Something which shows the screen: a window, or nothing at all.
+
+    Fields:
+    draws - True if the renderer does anything with the frames given to it.
+        If False, the screen is not even put together.
+    """
+
+    draws = True
+
+    def init(self):
+        """
+        Prepare to show frames.
+        """
+
+        pass
+
+    def invalidate(self):
+        """
+        Forget what has been shown, so that the next frame is shown in full.
+        """
+
+        pass
+
+    def drawFrame(self, array):
+        """
+        Show an array of tiles the size of the screen.
+        """
+
+        raise NotImplementedError("Only implemented by Renderer's children.")
+
+class TCODRenderer(Renderer):
+    """
+    Shows the screen in a libtcod window.
+
+    Only those cells which differ from the last array displayed are sent to
+    the console.  If BULK_UPLOAD is True, the colors are sent as whole planes
+    by upload_planes(); otherwise, each cell is printed by print_cells().
+
+    Fields:
+    front_buffer - the array of tiles currently on the console, or None if the
+        console must be redrawn entirely.
+    """
+
+    def __init__(self):
+        self.front_buffer = None
+
+    def init(self):
+        import libtcodpy as tcod
+
+        tcod.console_init_root(80, 24, "Because It's There", False)
+        self.invalidate()
+
+    def invalidate(self):
+        self.front_buffer = None
+
+    def drawFrame(self, array):
+        if self.front_buffer is None or self.front_buffer.shape != array.shape:
+            previous = None
+            dirty = numpy.ones(array.shape, bool)
+        else:
+            previous = self.front_buffer
+            dirty = array != previous
+
+        if BULK_UPLOAD:
+            upload_planes(array, dirty, previous)
+        else:
+            print_cells(array, dirty)
+
+        self.front_buffer = array.copy()
+        if metrics.enabled:
+            metrics.stats.count("display.cells_drawn", int(dirty.sum()))
+        refresh()
+
+class NullRenderer(Renderer):
+    """
+    Shows nothing, and opens no window, so that games can be played without
+    a screen as fast as the game logic allows.
+    """
+
+    draws = False
+
+    def drawFrame(self, array):
+        pass
+
+class RecordingRenderer(Renderer):
+    """
+    Keeps the frames it is given in memory, instead of showing them.
+
+    Fields:
+    frames - a list of copies of the arrays of tiles given, oldest first.
+    max_frames - the greatest number of frames kept, or None if there is no
+        limit.  Once there are more, the oldest are discarded.
+    """
+
+    def __init__(self, max_frames = None):
+        self.frames = []
+        self.max_frames = max_frames
+
+    def drawFrame(self, array):
+        self.frames.append(array.copy())
+        if self.max_frames is not None and len(self.frames) > self.max_frames:
+            del self.frames[0]
+
+# The renderer which shows the screen.  Change this before init() is called.
+renderer = TCODRenderer()
+
 def init():
-    tcod.console_init_root(80, 24, "Because It's There", False)
+    renderer.init()
+
+def invalidate():
+    """
+    Forget what is on the screen, so that the next frame redraws all of it.
+    """
+
+    renderer.invalidate()
 
 def refresh():
+    import libtcodpy as tcod
+
     tcod.console_flush()
 
 def wait_for_key():
@@ -24,6 +147,8 @@ def wait_for_key():
     Get a keypress from the user, and return its code (an integer).
     """
 
+    import libtcodpy as tcod
+
     key = tcod.console_wait_for_keypress(False)
     return key.c
 
@@ -37,21 +162,76 @@ def print_char(coords, char, color):
         (0, 0, 0) is black; (255, 255, 255) is white; (255, 0, 0) is red; etc.
     """
 
+    import libtcodpy as tcod
+
     # tcod.console_set_background_color(None, tcod.black)
     tcod.console_set_foreground_color(None, tcod.Color(color[0], color[1], color[2]))
     tcod.console_put_char(None, coords[0], coords[1], ord(char), tcod.BKGND_SET)
 
-def display_array(array):
+def print_cells(array, dirty):
     """
-    Copy the array of 1-character strings supplied to the screen, and flush.
+    Print the cells of an array of tiles which are marked dirty, one by one.
+
+    array - the array of tiles being displayed.
+    dirty - a boolean array the shape of array; True at each cell which
+        should be printed.
     """
 
-    for x in range(80):
-        for y in range(24):
-            glyph = array[x,y]
-            print_char((x, y), glyph.char, glyph.color)
+    (xs, ys) = numpy.nonzero(dirty)
+    for (x, y) in zip(xs.tolist(), ys.tolist()):
+        glyph = symbol.glyph(array[x,y])
+        print_char((x, y), glyph.char, glyph.color)
 
-    refresh()
+def upload_planes(array, dirty, previous):
+    """
+    Send an array of tiles to the console as whole planes of color, rather
+    than cell by cell.
+
+    The foreground colors of every cell go to the console in one call.
+    Characters cannot be sent in bulk, so only those characters which differ
+    from the ones already on the console are set, one by one.
+
+    array - the array of tiles being displayed.
+    dirty - a boolean array the shape of array; True at each cell which
+        differs from what is on the console.
+    previous - the array of tiles already on the console, or None if the
+        console's contents are unknown.
+    """
+
+    if not dirty.any():
+        return
+
+    import libtcodpy as tcod
+
+    chars = symbol.palette.getChars()
+    if previous is None:
+        blank = numpy.zeros(array.size, numpy.intc)
+        tcod.console_fill_background(None, blank, blank, blank)
+        changed_chars = numpy.ones(array.shape, bool)
+    else:
+        changed_chars = dirty & (chars[array] != chars[previous])
+
+# The console is stored row by row, whereas the arrays are indexed (x, y).
+    colors = symbol.palette.getColors()[array.T]
+    tcod.console_fill_foreground(None, colors[:,:,0].ravel(),
+        colors[:,:,1].ravel(), colors[:,:,2].ravel())
+
+    (xs, ys) = numpy.nonzero(changed_chars)
+    for (x, y, c) in zip(xs.tolist(), ys.tolist(),
+                         chars[array[xs, ys]].tolist()):
+        tcod.console_set_char(None, x, y, c)
+
+def display_array(array):
+    """
+    Show the array of tiles supplied with the current renderer.
+    """
+
+    measuring = metrics.enabled
+    if measuring:
+        start = metrics.clock()
+    renderer.drawFrame(array)
+    if measuring:
+        metrics.stats.time("display.frame", metrics.clock() - start)
 
     return
 
@@ -70,6 +250,8 @@ def refresh_screen(current_level = None):
             current_level = level_cache
 
     level_cache = current_level
+    if not renderer.draws:
+        return
 
     display_main_screen(current_level.getFOVArray(),
                         current_level.getPlayer().coords,
@@ -81,6 +263,9 @@ def display_main_screen(level_array, level_center,
     """
     Refresh the console with the three arrays provided.
     """
+    if not renderer.draws:
+        return
+
     assert message_array.shape == config.MESSAGES_DIMENSIONS
     assert sidebar_array.shape == config.STATUS_DIMENSIONS
 